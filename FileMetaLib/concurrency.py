@@ -3,27 +3,41 @@
 Concurrency utilities for FileMetaLib.
 """
 
+import heapq
+import itertools
+import logging
 import threading
 import time
-from typing import Callable, Optional, TypeVar, Generic
+from collections import OrderedDict, deque
+from typing import Callable, Generic, List, Optional, Tuple, TypeVar
 
 T = TypeVar("T")
 
+logger = logging.getLogger(__name__)
+
 
 class ReadWriteLock:
     """
     A lock object that allows many simultaneous "read locks", but only one "write lock."
 
     This is useful for protecting data structures that are frequently read but seldom modified.
+    Blocked threads wait in a FIFO queue and are handed the lock directly, so a release
+    wakes exactly the threads that can proceed instead of every waiter.
     """
 
-    def __init__(self):
-        """Initialize a new ReadWriteLock."""
-        self._read_ready = threading.Condition(threading.RLock())
+    def __init__(self, prefer_writers: bool = True):
+        """
+        Initialize a new ReadWriteLock.
+
+        Args:
+            prefer_writers: Whether new readers queue behind waiting writers.
+                If False, readers only wait while a writer holds the lock.
+        """
+        self.prefer_writers = prefer_writers
+        self._lock = threading.Lock()
         self._readers = 0
-        self._writers = 0
-        self._write_waiting = 0
-        self._promote_waiting = 0
+        self._writer = False
+        self._waiters = deque()
 
     def acquire_read(self):
         """
@@ -31,17 +45,22 @@ class ReadWriteLock:
 
         Blocks only if a thread has acquired or is waiting for the write lock.
         """
-        with self._read_ready:
-            while self._writers > 0 or self._write_waiting > 0:
-                self._read_ready.wait()
-            self._readers += 1
+        with self._lock:
+            if not self._writer and not (self.prefer_writers and self._waiters):
+                self._readers += 1
+                return
+            event = threading.Event()
+            self._waiters.append(("read", event))
+
+        # The releasing thread counts us as a reader before setting the event
+        event.wait()
 
     def release_read(self):
         """Release a read lock."""
-        with self._read_ready:
+        with self._lock:
             self._readers -= 1
             if self._readers == 0:
-                self._read_ready.notify_all()
+                self._grant()
 
     def acquire_write(self):
         """
@@ -49,18 +68,52 @@ class ReadWriteLock:
 
         Blocks until there are no active readers or writers.
         """
-        with self._read_ready:
-            self._write_waiting += 1
-            while self._readers > 0 or self._writers > 0:
-                self._read_ready.wait()
-            self._write_waiting -= 1
-            self._writers += 1
+        with self._lock:
+            if not self._writer and self._readers == 0 and not self._waiters:
+                self._writer = True
+                return
+            event = threading.Event()
+            self._waiters.append(("write", event))
+
+        # The releasing thread marks us as the writer before setting the event
+        event.wait()
 
     def release_write(self):
         """Release a write lock."""
-        with self._read_ready:
-            self._writers -= 1
-            self._read_ready.notify_all()
+        with self._lock:
+            self._writer = False
+            self._grant()
+
+    def _grant(self):
+        """Hand the lock to the next waiters. Must be called with the internal lock held."""
+        if self._writer or not self._waiters:
+            return
+
+        kind, event = self._waiters[0]
+        if kind == "write":
+            if self._readers == 0:
+                self._waiters.popleft()
+                self._writer = True
+                event.set()
+            return
+
+        if self.prefer_writers:
+            # Wake the batch of readers at the head of the queue
+            while self._waiters and self._waiters[0][0] == "read":
+                _, event = self._waiters.popleft()
+                self._readers += 1
+                event.set()
+        else:
+            # Wake every queued reader, leaving writers in order
+            writers = deque()
+            while self._waiters:
+                kind, event = self._waiters.popleft()
+                if kind == "read":
+                    self._readers += 1
+                    event.set()
+                else:
+                    writers.append((kind, event))
+            self._waiters = writers
 
     def __enter__(self):
         """Enter context manager for write lock."""
@@ -123,17 +176,23 @@ class Transaction:
     This class provides a way to perform multiple operations atomically.
     """
 
-    def __init__(self, commit_func: Callable, rollback_func: Callable):
+    def __init__(
+        self,
+        commit_func: Optional[Callable] = None,
+        rollback_func: Optional[Callable] = None,
+    ):
         """
         Initialize a new Transaction.
 
         Args:
-            commit_func: Function to call on commit.
-            rollback_func: Function to call on rollback.
+            commit_func: Function to call on commit, if any.
+            rollback_func: Function to call on rollback, if any.
         """
         self.commit_func = commit_func
         self.rollback_func = rollback_func
-        self.operations = []
+        # Operations and their undo operations, stored as parallel lists
+        self._ops = []
+        self._undos = []
         self.committed = False
         self.rolled_back = False
 
@@ -148,7 +207,18 @@ class Transaction:
         if self.committed or self.rolled_back:
             raise ValueError("Transaction already committed or rolled back")
 
-        self.operations.append((operation, undo_operation))
+        self._ops.append(operation)
+        self._undos.append(undo_operation)
+
+    @property
+    def operations(self) -> List[Tuple[Callable, Callable]]:
+        """
+        Get the operations added so far.
+
+        Returns:
+            List of (operation, undo_operation) tuples.
+        """
+        return list(zip(self._ops, self._undos))
 
     def commit(self):
         """
@@ -162,36 +232,45 @@ class Transaction:
 
         try:
             # Execute all operations
-            for operation, _ in self.operations:
+            for operation in self._ops:
                 operation()
 
             # Call commit function
-            self.commit_func()
-
-            self.committed = True
-        except Exception as e:
+            if self.commit_func is not None:
+                self.commit_func()
+        except Exception:
             # Rollback on failure
             self.rollback()
-            raise e
+            raise
+
+        self.committed = True
 
     def rollback(self):
         """Roll back the transaction."""
         if self.committed or self.rolled_back:
             raise ValueError("Transaction already committed or rolled back")
 
-        # Execute undo operations in reverse order
-        for _, undo_operation in reversed(self.operations):
+        # Execute undo operations in reverse order, collecting failures
+        failures = []
+        for undo_operation in reversed(self._undos):
             try:
                 undo_operation()
-            except Exception:
-                # Ignore errors in undo operations
-                pass
+            except Exception as e:
+                failures.append(e)
 
         # Call rollback function
-        self.rollback_func()
+        if self.rollback_func is not None:
+            self.rollback_func()
 
         self.rolled_back = True
 
+        if failures:
+            logger.warning(
+                "%d undo operation(s) failed during rollback: %s",
+                len(failures),
+                "; ".join(str(e) for e in failures),
+            )
+
     def __enter__(self):
         """Enter context manager."""
         return self
@@ -207,31 +286,72 @@ class Transaction:
             return False
 
 
+class _CacheShard:
+    """A single stripe of a Cache with its own entries and lock."""
+
+    __slots__ = ("cache", "lock", "max_size", "next_sweep")
+
+    def __init__(self, max_size: int, next_sweep: float):
+        """
+        Initialize a new _CacheShard.
+
+        Args:
+            max_size: Maximum number of items in the shard.
+            next_sweep: Monotonic time of the first full sweep.
+        """
+        # key -> (value, expiry); ordered from least to most recently used
+        self.cache = OrderedDict()
+        self.lock = threading.RLock()
+        self.max_size = max_size
+        self.next_sweep = next_sweep
+
+
 class Cache(Generic[T]):
     """
     Thread-safe cache with expiration.
 
-    This class provides a thread-safe cache with expiration.
+    This class provides a thread-safe cache with expiration. Keys are spread
+    over independently locked shards so concurrent readers only contend when
+    their keys land on the same shard.
+
+    max_size is split across the shards and each shard evicts its own least
+    recently used item when full. Eviction is therefore approximate: a shard
+    that receives more than its share of keys starts evicting before the
+    cache as a whole holds max_size items.
     """
 
-    def __init__(self, max_size: int = 100, ttl: int = 300):
+    # Maximum number of expired items dropped inline per get/set
+    _EXPIRE_BATCH = 8
+
+    def __init__(self, max_size: int = 100, ttl: int = 300, num_shards: int = 16):
         """
         Initialize a new Cache.
 
         Args:
             max_size: Maximum number of items in the cache.
             ttl: Time to live in seconds.
+            num_shards: Number of lock stripes. Rounded down to a power of two
+                and to at most max_size.
         """
         self.max_size = max_size
         self.ttl = ttl
-        self.cache = {}
-        self.timestamps = {}
-        self.lock = threading.RLock()
 
-        # Start cleanup thread
-        self.running = True
-        self.cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
-        self.cleanup_thread.start()
+        # Power-of-two shard count so shard selection is a single mask
+        num_shards = max(1, min(num_shards, max_size))
+        num_shards = 1 << (num_shards.bit_length() - 1)
+        self.num_shards = num_shards
+        self._shard_mask = num_shards - 1
+
+        # Expired items are dropped inline by get/set; a full sweep runs at most
+        # once per sweep interval instead of on a dedicated cleanup thread
+        self.sweep_interval = min(ttl / 2, 60) if ttl > 0 else 0
+        # Shard capacities add up to max_size; the first shards take the remainder
+        shard_size, remainder = divmod(max_size, num_shards)
+        next_sweep = time.monotonic() + self.sweep_interval
+        self._shards = [
+            _CacheShard(shard_size + (i < remainder), next_sweep)
+            for i in range(num_shards)
+        ]
 
     def get(self, key: str) -> Optional[T]:
         """
@@ -243,22 +363,32 @@ class Cache(Generic[T]):
         Returns:
             Item, or None if not found or expired.
         """
-        with self.lock:
-            if key not in self.cache:
-                return None
+        shard = self._shards[hash(key) & self._shard_mask]
 
-            # Check if expired
-            timestamp = self.timestamps[key]
-            if self.ttl > 0 and time.time() - timestamp > self.ttl:
-                # Expired, remove
-                del self.cache[key]
-                del self.timestamps[key]
+        with shard.lock:
+            entry = shard.cache.get(key)
+            if entry is None:
                 return None
 
-            # Update timestamp
-            self.timestamps[key] = time.time()
-
-            return self.cache[key]
+            value, expiry = entry
+            if expiry is not None:
+                now = time.monotonic()
+                if now > expiry:
+                    # Expired, remove
+                    del shard.cache[key]
+                    self._expire(shard, now)
+                    return None
+
+                # Access renews the time to live, so least recently used
+                # items are also the first to expire
+                shard.cache[key] = (value, now + self.ttl)
+                shard.cache.move_to_end(key)
+                self._expire(shard, now)
+            else:
+                # Mark as most recently used
+                shard.cache.move_to_end(key)
+
+            return value
 
     def set(self, key: str, value: T) -> None:
         """
@@ -268,17 +398,25 @@ class Cache(Generic[T]):
             key: Key to set.
             value: Value to set.
         """
-        with self.lock:
-            # Check if cache is full
-            if len(self.cache) >= self.max_size and key not in self.cache:
-                # Remove oldest item
-                oldest_key = min(self.timestamps, key=lambda k: self.timestamps[k])
-                del self.cache[oldest_key]
-                del self.timestamps[oldest_key]
+        if self.ttl > 0:
+            now = time.monotonic()
+            expiry = now + self.ttl
+        else:
+            expiry = None
+
+        shard = self._shards[hash(key) & self._shard_mask]
+
+        with shard.lock:
+            if expiry is not None:
+                self._expire(shard, now)
 
-            # Set item
-            self.cache[key] = value
-            self.timestamps[key] = time.time()
+            if key in shard.cache:
+                shard.cache.move_to_end(key)
+            elif len(shard.cache) >= shard.max_size:
+                # Remove least recently used item
+                shard.cache.popitem(last=False)
+
+            shard.cache[key] = (value, expiry)
 
     def delete(self, key: str) -> None:
         """
@@ -287,51 +425,162 @@ class Cache(Generic[T]):
         Args:
             key: Key to delete.
         """
-        with self.lock:
-            if key in self.cache:
-                del self.cache[key]
-                del self.timestamps[key]
+        shard = self._shards[hash(key) & self._shard_mask]
+
+        with shard.lock:
+            shard.cache.pop(key, None)
 
     def clear(self) -> None:
         """Clear the cache."""
-        with self.lock:
-            self.cache.clear()
-            self.timestamps.clear()
+        for shard in self._shards:
+            with shard.lock:
+                shard.cache.clear()
 
     def stop(self) -> None:
-        """Stop the cleanup thread."""
-        self.running = False
-        self.cleanup_thread.join(timeout=1)
+        """
+        Stop background cleanup.
 
-    def _cleanup_loop(self) -> None:
-        """Cleanup loop for expired items."""
-        while self.running:
-            time.sleep(min(self.ttl / 2, 60) if self.ttl > 0 else 60)
-            self._cleanup()
+        Kept for backward compatibility: expired items are dropped by get
+        and set, so there is no cleanup thread to stop.
+        """
+        pass
 
-    def _cleanup(self) -> None:
-        """Clean up expired items."""
-        if self.ttl <= 0:
-            return
+    def __len__(self) -> int:
+        """Get the number of items in the cache, including unswept expired ones."""
+        return sum(len(shard.cache) for shard in self._shards)
 
-        with self.lock:
-            now = time.time()
+    def _expire(self, shard: _CacheShard, now: float) -> None:
+        """
+        Drop expired items from the least recently used end of a shard.
+
+        At most _EXPIRE_BATCH items are dropped per call, plus a full sweep
+        once the sweep interval has elapsed. Must be called with the shard
+        lock held.
+
+        Args:
+            shard: Shard to expire items from.
+            now: Current monotonic time.
+        """
+        cache = shard.cache
+        for _ in range(self._EXPIRE_BATCH):
+            if not cache:
+                return
+            key, (_, expiry) = next(iter(cache.items()))
+            if now <= expiry:
+                break
+            del cache[key]
+
+        if now >= shard.next_sweep:
+            shard.next_sweep = now + self.sweep_interval
             expired_keys = [
-                key
-                for key, timestamp in self.timestamps.items()
-                if now - timestamp > self.ttl
+                key for key, (_, expiry) in cache.items() if now > expiry
             ]
 
             for key in expired_keys:
-                del self.cache[key]
-                del self.timestamps[key]
+                del cache[key]
+
+
+class _ScheduledTask:
+    """Handle for a callback registered with the shared scheduler."""
+
+    __slots__ = ("interval", "callback", "cancelled")
+
+    def __init__(self, interval: float, callback: Callable[[], None]):
+        """
+        Initialize a new _ScheduledTask.
+
+        Args:
+            interval: Interval in seconds between runs, or 0 for one-time tasks.
+            callback: Callback to run.
+        """
+        self.interval = interval
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        """Cancel all future runs."""
+        self.cancelled = True
+
+
+class _Scheduler:
+    """
+    Process-wide scheduler running every BackgroundTask on a single thread.
+
+    Due times are kept in a heap and the thread sleeps until the earliest one,
+    so any number of periodic tasks costs one mostly idle daemon thread.
+    """
+
+    def __init__(self):
+        """Initialize a new _Scheduler."""
+        self._heap = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def schedule(self, interval: float, callback: Callable[[], None]) -> _ScheduledTask:
+        """
+        Schedule a callback to run now and then every interval seconds.
+
+        Args:
+            interval: Interval in seconds between runs, or 0 for one-time tasks.
+            callback: Callback to run. Must not raise.
+
+        Returns:
+            Handle that can be used to cancel the callback.
+        """
+        handle = _ScheduledTask(interval, callback)
+
+        with self._cond:
+            heapq.heappush(self._heap, (time.monotonic(), next(self._counter), handle))
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+
+            self._cond.notify()
+
+        return handle
+
+    def _run(self) -> None:
+        """Run due callbacks forever."""
+        while True:
+            with self._cond:
+                while True:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+
+                    run_at, _, handle = self._heap[0]
+                    if handle.cancelled:
+                        heapq.heappop(self._heap)
+                        continue
+
+                    delay = run_at - time.monotonic()
+                    if delay <= 0:
+                        heapq.heappop(self._heap)
+                        break
+
+                    self._cond.wait(delay)
+
+            handle.callback()
+
+            if handle.interval > 0 and not handle.cancelled:
+                with self._cond:
+                    heapq.heappush(
+                        self._heap,
+                        (time.monotonic() + handle.interval, next(self._counter), handle),
+                    )
+
+
+_scheduler = _Scheduler()
 
 
 class BackgroundTask:
     """
     Background task manager.
 
-    This class provides a way to run tasks in the background.
+    This class provides a way to run tasks in the background. All tasks share
+    a single scheduler thread, so a long-running task delays the others.
     """
 
     def __init__(self, interval: int = 0, daemon: bool = True):
@@ -340,12 +589,22 @@ class BackgroundTask:
 
         Args:
             interval: Interval in seconds between runs, or 0 for one-time tasks.
-            daemon: Whether the thread should be a daemon thread.
+            daemon: Kept for backward compatibility. Tasks always run on the
+                shared daemon scheduler thread.
         """
         self.interval = interval
         self.daemon = daemon
         self.running = False
-        self.thread = None
+        self._handle = None
+
+        # Bumped by stop() so runs already queued by the scheduler are skipped
+        self._generation = 0
+        self._state_lock = threading.Lock()
+
+        # Cleared while the task runs, and the thread running it
+        self._idle = threading.Event()
+        self._idle.set()
+        self._runner = None
 
     def start(self, task: Callable, *args, **kwargs) -> None:
         """
@@ -356,31 +615,44 @@ class BackgroundTask:
             *args: Arguments to pass to the task.
             **kwargs: Keyword arguments to pass to the task.
         """
-        if self.running:
-            raise ValueError("Task already running")
+        with self._state_lock:
+            if self.running:
+                raise ValueError("Task already running")
 
-        self.running = True
+            self.running = True
+            generation = self._generation
 
         def run():
-            while self.running:
-                try:
-                    task(*args, **kwargs)
-                except Exception as e:
-                    print(f"Error in background task: {e}")
+            with self._state_lock:
+                if self._generation != generation:
+                    # Stopped after the scheduler picked this run
+                    return
+                self._idle.clear()
+                self._runner = threading.get_ident()
 
-                if self.interval <= 0:
-                    # One-time task
-                    self.running = False
-                    break
+            try:
+                task(*args, **kwargs)
+            except Exception:
+                logger.exception("Error in background task")
+            finally:
+                self._runner = None
+                self._idle.set()
 
-                time.sleep(self.interval)
+            if self.interval <= 0:
+                # One-time task
+                self.running = False
 
-        self.thread = threading.Thread(target=run, daemon=self.daemon)
-        self.thread.start()
+        self._handle = _scheduler.schedule(self.interval, run)
 
     def stop(self) -> None:
-        """Stop the task."""
-        self.running = False
-        if self.thread:
-            self.thread.join(timeout=1)
-            self.thread = None
+        """Stop the task, waiting for a run in progress to finish."""
+        with self._state_lock:
+            self.running = False
+            self._generation += 1
+            if self._handle:
+                self._handle.cancel()
+                self._handle = None
+
+        # A task stopping itself cannot wait for its own run
+        if self._runner != threading.get_ident():
+            self._idle.wait()
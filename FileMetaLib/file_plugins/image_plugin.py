@@ -4,11 +4,31 @@ Image file plugin for FileMetaLib.
 """
 
 import os
-from typing import Dict, Any
+import sys
+from typing import Dict, Any, FrozenSet, Optional
 
 from ..file_plugins import FilePlugin
 from ..exceptions import PluginError
 
+# EXIF tag id -> interned tag name, built once per process from PIL.ExifTags.TAGS
+_EXIF_TAGS: Optional[Dict[int, str]] = None
+
+
+def _get_exif_tags(exif_tags) -> Dict[int, str]:
+    """
+    Get the shared EXIF tag name table.
+
+    Args:
+        exif_tags: The PIL.ExifTags module.
+
+    Returns:
+        Dictionary mapping EXIF tag ids to interned tag names.
+    """
+    global _EXIF_TAGS
+    if _EXIF_TAGS is None:
+        _EXIF_TAGS = {tag: sys.intern(name) for tag, name in exif_tags.TAGS.items()}
+    return _EXIF_TAGS
+
 
 class ImagePlugin(FilePlugin):
     """
@@ -17,6 +37,9 @@ class ImagePlugin(FilePlugin):
     This plugin uses the Pillow library to extract metadata from image files.
     """
 
+    # Lowercase extensions handled by this plugin
+    _EXTS = frozenset({".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff"})
+
     def __init__(self):
         """Initialize a new ImagePlugin."""
         try:
@@ -24,6 +47,7 @@ class ImagePlugin(FilePlugin):
 
             self.Image = Image
             self.ExifTags = ExifTags
+            self._tags_get = _get_exif_tags(ExifTags).get
         except ImportError:
             raise PluginError(
                 "Pillow library not installed. Install with 'pip install Pillow'."
@@ -39,8 +63,29 @@ class ImagePlugin(FilePlugin):
         Returns:
             Whether the plugin supports the file.
         """
-        ext = os.path.splitext(path)[1].lower()
-        return ext in [".jpg", ".jpeg", ".png", ".gif", ".bmp", ".tiff"]
+        return os.path.splitext(path)[1].lower() in self._EXTS
+
+    def supports_ext(self, ext: str) -> bool:
+        """
+        Check if the plugin supports files with an extension.
+
+        Args:
+            ext: Lowercase extension including the leading dot.
+
+        Returns:
+            Whether the plugin supports the extension.
+        """
+        return ext in self._EXTS
+
+    @classmethod
+    def extensions(cls) -> FrozenSet[str]:
+        """
+        Get the file extensions handled by the plugin.
+
+        Returns:
+            Lowercase extensions including the leading dot.
+        """
+        return cls._EXTS
 
     def extract(self, path: str) -> Dict[str, Any]:
         """
@@ -56,34 +101,55 @@ class ImagePlugin(FilePlugin):
             PluginError: If metadata extraction fails.
         """
         try:
-            image = self.Image.open(path)
-
-            metadata = {
-                "width": image.width,
-                "height": image.height,
-                "format": image.format,
-                "mode": image.mode,
-            }
-
-            # Extract EXIF data if available
-            if hasattr(image, "_getexif") and image._getexif():
-                exif = {
-                    self.ExifTags.TAGS.get(k, k): v
-                    for k, v in image._getexif().items()
-                    if k in self.ExifTags.TAGS
-                }
-
-                # Convert binary data to string representation
-                for key, value in exif.items():
-                    if isinstance(value, bytes):
-                        exif[key] = str(value)
-
-                metadata["exif"] = exif
-
-            return metadata
+            with self.Image.open(path) as image:
+                return self._extract_image(image)
         except Exception as e:
             raise PluginError(f"Failed to extract image metadata: {str(e)}")
 
+    def _extract_image(self, image) -> Dict[str, Any]:
+        """
+        Extract metadata from an opened image.
+
+        Args:
+            image: Opened PIL image. Pixel data is never decoded.
+
+        Returns:
+            Extracted metadata.
+        """
+        metadata = {
+            "width": image.width,
+            "height": image.height,
+            "format": image.format,
+            "mode": image.mode,
+        }
+
+        # Extract EXIF data if available
+        if not hasattr(image, "_getexif"):
+            return metadata
+
+        raw_exif = image._getexif()
+        if raw_exif:
+            exif = {}
+            tags_get = self._tags_get
+
+            # Resolve tag names and convert binary data in a single pass
+            for tag, value in raw_exif.items():
+                name = tags_get(tag)
+                if name is None:
+                    continue
+                if type(value) is bytes:
+                    # Text tags are stored as text; binary ones such as
+                    # MakerNote keep their lossless repr
+                    try:
+                        value = value.decode("utf-8")
+                    except UnicodeDecodeError:
+                        value = str(value)
+                exif[name] = value
+
+            metadata["exif"] = exif
+
+        return metadata
+
     @property
     def priority(self) -> int:
         """
@@ -93,3 +159,15 @@ class ImagePlugin(FilePlugin):
             Plugin priority.
         """
         return 10
+
+    @property
+    def thread_safe(self) -> bool:
+        """
+        Whether extract() may run on several threads at once.
+
+        Each call opens its own image and only reads shared tables.
+
+        Returns:
+            Plugin thread safety.
+        """
+        return True
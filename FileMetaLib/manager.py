@@ -4,17 +4,42 @@ Core manager class for FileMetaLib.
 """
 
 
+import json
+import logging
 import os
-import time
 import threading
+from concurrent.futures import as_completed
 from typing import Dict, List, Any, Optional, Union, Callable, Iterable
 
+from .concurrency import BackgroundTask
 from .storage import StorageBackend, MemoryDB
 from .registry import MetadataRegistry
 from .plugins  import PluginRegistry, FilePlugin  
 from .query import QueryEngine
+from .write_buffer import WriteBuffer
 from .exceptions import FileAccessError, PluginError
-from .utils import normalize_path, get_system_metadata
+from .utils import (
+    normalize_path,
+    format_time,
+    get_system_metadata,
+    find_missing,
+    json_loads,
+    stat_many,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class _NullLock:
+    """No-op stand-in for a lock when thread safety is disabled."""
+
+    def __enter__(self):
+        """Enter context manager."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Exit context manager."""
+        return False
 
 
 class FileMetaManager:
@@ -40,6 +65,7 @@ class FileMetaManager:
         auto_sync: bool = False,
         sync_interval: int = 300,
         thread_safe: bool = False,
+        consistency: str = "sc",
     ):
         """
         Initialize a new FileMetaManager.
@@ -49,7 +75,15 @@ class FileMetaManager:
             auto_sync: Whether to automatically sync with the file system.
             sync_interval: Interval in seconds for auto sync.
             thread_safe: Whether to use thread-safe operations.
+            consistency: Storage write mode. 'sc' writes every change to the
+                storage backend before returning; 'wb' buffers changes and writes
+                them in batches from a background thread. Reads are served from
+                the in-memory registry in both modes. Call flush() or close() to
+                make buffered changes durable.
         """
+        if consistency not in ("sc", "wb"):
+            raise ValueError(f"Unknown consistency mode: {consistency}")
+
         self.storage = storage_backend or MemoryDB()
         self.registry = MetadataRegistry()
         self.plugins = PluginRegistry()
@@ -58,7 +92,13 @@ class FileMetaManager:
         self.auto_sync = auto_sync
         self.sync_interval = sync_interval
         self.thread_safe = thread_safe
-        self._lock = threading.RLock() if thread_safe else None
+        self._lock = threading.RLock() if thread_safe else _NullLock()
+        self._buffer = WriteBuffer(self.storage) if consistency == "wb" else None
+        self._sync_task = None
+
+        # path -> (mtime_ns, size, plugin registry version) when add_file
+        # last processed it, used to skip files that have not changed
+        self._file_states = {}
 
         # Load existing metadata from storage
         self._load_from_storage()
@@ -68,14 +108,23 @@ class FileMetaManager:
             self._start_auto_sync()
 
     def add_file(
-        self, path: str, metadata: Optional[Dict[str, Any]] = None
+        self,
+        path: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        force: bool = False,
     ) -> Dict[str, Any]:
         """
         Add a file with metadata.
 
+        If the file was already added with the same modification time, size
+        and user metadata, and no plugin has been registered since, the
+        existing metadata is returned without running plugins or writing to
+        storage.
+
         Args:
             path: Path to the file.
             metadata: User-defined metadata to attach.
+            force: Whether to re-run plugins and save even if nothing changed.
 
         Returns:
             Complete metadata including system metadata.
@@ -85,32 +134,37 @@ class FileMetaManager:
         """
         path = normalize_path(path)
 
-        if not os.path.exists(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
             raise FileAccessError(f"File not found: {path}")
 
+        state = (stat.st_mtime_ns, stat.st_size, self.plugins.version)
+        if not force and self._file_states.get(path) == state:
+            existing = self.registry.get(path)
+            if existing is not None and existing["user"] == (metadata or {}):
+                return existing
+
         # Get system metadata
-        system_meta = get_system_metadata(path)
+        system_meta = get_system_metadata(path, stat)
 
         # Combine with user metadata
         full_metadata = {"system": system_meta, "user": metadata or {}}
 
         # Run plugins to extract additional metadata
         try:
-            plugin_metadata = self._run_plugins(path)
+            plugin_metadata = self._run_plugins(path, stat)
             if plugin_metadata:
                 full_metadata["plugin"] = plugin_metadata
         except PluginError as e:
             # Log error but continue
-            print(f"Plugin error for {path}: {e}")
+            logger.warning("Plugin error for %s: %s", path, e)
 
         # Store metadata
-        if self.thread_safe and self._lock is not None:
-            with self._lock:
-                self.registry.add(path, full_metadata)
-                self.storage.save(path, full_metadata)
-        else:
+        with self._lock:
             self.registry.add(path, full_metadata)
-            self.storage.save(path, full_metadata)
+            self._save(path, full_metadata)
+            self._file_states[path] = state
 
         return full_metadata
 
@@ -129,11 +183,8 @@ class FileMetaManager:
         """
         path = normalize_path(path)
 
-        if self.thread_safe and self._lock is not None:
-            with self._lock:
-                metadata = self.registry.get(path)
-        else:
-            metadata = self.registry.get(path)
+        # Entries are never mutated after publication, so no lock is needed
+        metadata = self.registry.get(path)
 
         if not metadata:
             raise FileAccessError(f"No metadata found for: {path}")
@@ -156,33 +207,25 @@ class FileMetaManager:
         """
         path = normalize_path(path)
 
-        if self.thread_safe and self._lock is not None:
-            with self._lock:
-                current = self.registry.get(path)
-                if not current:
-                    raise FileAccessError(f"No metadata found for: {path}")
-
-                # Update user metadata
-                current["user"].update(metadata)
-
-                # Save updated metadata
-                self.registry.update(path, current)
-                self.storage.save(path, current)
-
-                return current
-        else:
+        with self._lock:
             current = self.registry.get(path)
             if not current:
                 raise FileAccessError(f"No metadata found for: {path}")
 
-            # Update user metadata
-            current["user"].update(metadata)
+            # Nothing to write if every field already has the given value
+            user = {**current["user"], **metadata}
+            if user == current["user"]:
+                return current
+
+            # Update user metadata on a copy of the entry
+            updated = dict(current)
+            updated["user"] = user
 
-            # Save updated metadata
-            self.registry.update(path, current)
-            self.storage.save(path, current)
+            # Save updated metadata; only the user section changed
+            self.registry.update(path, updated)
+            self._save_section(path, "user", updated)
 
-            return current
+            return updated
 
     def replace_metadata(self, path: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -200,33 +243,24 @@ class FileMetaManager:
         """
         path = normalize_path(path)
 
-        if self.thread_safe and self._lock is not None:
-            with self._lock:
-                current = self.registry.get(path)
-                if not current:
-                    raise FileAccessError(f"No metadata found for: {path}")
-
-                # Replace user metadata
-                current["user"] = metadata
-
-                # Save updated metadata
-                self.registry.update(path, current)
-                self.storage.save(path, current)
-
-                return current
-        else:
+        with self._lock:
             current = self.registry.get(path)
             if not current:
                 raise FileAccessError(f"No metadata found for: {path}")
 
-            # Replace user metadata
-            current["user"] = metadata
+            # Nothing to write if the user metadata is unchanged
+            if metadata == current["user"]:
+                return current
+
+            # Replace user metadata on a copy of the entry
+            updated = dict(current)
+            updated["user"] = metadata
 
-            # Save updated metadata
-            self.registry.update(path, current)
-            self.storage.save(path, current)
+            # Save updated metadata; only the user section changed
+            self.registry.update(path, updated)
+            self._save_section(path, "user", updated)
 
-            return current
+            return updated
 
     def delete_metadata(self, path: str) -> None:
         """
@@ -237,13 +271,10 @@ class FileMetaManager:
         """
         path = normalize_path(path)
 
-        if self.thread_safe and self._lock is not None:
-            with self._lock:
-                self.registry.remove(path)
-                self.storage.delete(path)
-        else:
+        with self._lock:
             self.registry.remove(path)
-            self.storage.delete(path)
+            self._delete(path)
+            self._file_states.pop(path, None)
 
     def search(self, query: Dict[str, Any]) -> Iterable[str]:
         """
@@ -266,11 +297,12 @@ class FileMetaManager:
         Returns:
             Dictionary with counts of added, updated, and removed files.
         """
-        if self.thread_safe and self._lock is not None:
-            with self._lock:
-                return self._do_sync()
-        else:
-            return self._do_sync()
+        with self._lock:
+            result = self._do_sync()
+
+        self.flush()
+
+        return result
 
     def cleanup_orphaned(self) -> int:
         """
@@ -279,12 +311,28 @@ class FileMetaManager:
         Returns:
             Number of orphaned entries removed.
         """
-        if self.thread_safe and self._lock is not None:
-            with self._lock:
-                return self._do_cleanup()
-        else:
+        with self._lock:
             return self._do_cleanup()
 
+    def flush(self) -> None:
+        """Write any buffered changes to the storage backend."""
+        if self._buffer is not None:
+            self._buffer.flush()
+
+    def stop_auto_sync(self) -> None:
+        """Stop automatic synchronization with the file system."""
+        self.auto_sync = False
+        if self._sync_task is not None:
+            self._sync_task.stop()
+            self._sync_task = None
+
+    def close(self) -> None:
+        """Stop auto sync, write any buffered changes and close the storage backend."""
+        self.stop_auto_sync()
+        if self._buffer is not None:
+            self._buffer.close()
+        self.storage.close()
+
     def register_plugin(self, plugin) -> None:
         """
         Register a file plugin.
@@ -304,30 +352,31 @@ class FileMetaManager:
         Returns:
             Number of entries exported.
         """
-        if self.thread_safe and self._lock is not None:
-            with self._lock:
-                all_metadata = {
-                    path: self.registry.get(path)
-                    for path in self.registry.get_all_paths()
-                }
-
-                with open(output_path, "w") as f:
-                    import json
-
-                    json.dump(all_metadata, f, indent=2)
+        count = 0
 
-                return len(all_metadata)
-        else:
-            all_metadata = {
-                path: self.registry.get(path) for path in self.registry.get_all_paths()
-            }
+        # Stream one entry at a time instead of building the whole document.
+        # Entries are never mutated after publication, so no lock is needed.
+        with open(output_path, "w", buffering=1 << 20) as f:
+            f.write("{")
 
-            with open(output_path, "w") as f:
-                import json
+            for path in self.registry.get_all_paths():
+                metadata = self.registry.get(path)
+                if metadata is None:
+                    # Removed since the path list was taken
+                    continue
+
+                # Same output as json.dump(..., indent=2) of the whole mapping.
+                # The json module is used so number formatting matches too.
+                entry = json.dumps(metadata, indent=2).replace("\n", "\n  ")
+                f.write(",\n  " if count else "\n  ")
+                f.write(json.dumps(path))
+                f.write(": ")
+                f.write(entry)
+                count += 1
 
-                json.dump(all_metadata, f, indent=2)
+            f.write("\n}" if count else "}")
 
-            return len(all_metadata)
+        return count
 
     def import_metadata(
         self, input_path: str, conflict_strategy: str = "replace"
@@ -340,21 +389,15 @@ class FileMetaManager:
             conflict_strategy: Strategy for handling conflicts ('replace', 'merge', 'skip').
 
         Returns:
-            Number of entries imported.
+            Number of entries imported. Entries identical to the existing
+            metadata are skipped and not counted.
         """
-        with open(input_path, "r") as f:
-            import json
-
-            imported_data = json.load(f)
+        with open(input_path, "rb") as f:
+            imported_data = json_loads(f.read())
 
         count = 0
 
-        if self.thread_safe and self._lock is not None:
-            with self._lock:
-                for path, metadata in imported_data.items():
-                    if self._import_entry(path, metadata, conflict_strategy):
-                        count += 1
-        else:
+        with self._lock:
             for path, metadata in imported_data.items():
                 if self._import_entry(path, metadata, conflict_strategy):
                     count += 1
@@ -373,60 +416,130 @@ class FileMetaManager:
             conflict_strategy: Strategy for handling conflicts.
 
         Returns:
-            Whether the entry was imported.
+            Whether the entry was imported. Entries that would not change the
+            stored metadata are not written and count as not imported.
         """
         existing = self.registry.get(path)
 
+        # The imported entry replaces what add_file last extracted
+        if not (existing and conflict_strategy == "skip"):
+            self._file_states.pop(path, None)
+
         if existing:
             if conflict_strategy == "skip":
                 return False
             elif conflict_strategy == "merge":
-                existing["user"].update(metadata.get("user", {}))
+                merged = dict(existing)
+                merged["user"] = {**existing["user"], **metadata.get("user", {})}
                 if "plugin" in metadata:
-                    existing.setdefault("plugin", {}).update(metadata["plugin"])
-                self.registry.update(path, existing)
-                self.storage.save(path, existing)
+                    merged["plugin"] = {**existing.get("plugin", {}), **metadata["plugin"]}
+                if merged == existing:
+                    return False
+                self.registry.update(path, merged)
+                self._save(path, merged)
             else:  # replace
+                if metadata == existing:
+                    return False
                 self.registry.update(path, metadata)
-                self.storage.save(path, metadata)
+                self._save(path, metadata)
         else:
             self.registry.add(path, metadata)
-            self.storage.save(path, metadata)
+            self._save(path, metadata)
 
         return True
 
+    def _save(self, path: str, metadata: Dict[str, Any]) -> None:
+        """
+        Save metadata to storage, through the write buffer if enabled.
+
+        Args:
+            path: Path to the file.
+            metadata: Metadata to save.
+        """
+        if self._buffer is not None:
+            self._buffer.enqueue(path, metadata)
+        else:
+            self.storage.save(path, metadata)
+
+    def _save_section(self, path: str, section: str, metadata: Dict[str, Any]) -> None:
+        """
+        Save a change to one metadata section, through the write buffer if enabled.
+
+        Args:
+            path: Path to the file.
+            section: Name of the changed section.
+            metadata: Full metadata including the change.
+        """
+        if self._buffer is not None:
+            # Buffered writes keep only the latest full entry per path
+            self._buffer.enqueue(path, metadata)
+        else:
+            self.storage.save_patch(path, section, metadata[section], metadata)
+
+    def _delete(self, path: str) -> None:
+        """
+        Delete metadata from storage, through the write buffer if enabled.
+
+        Args:
+            path: Path to the file.
+        """
+        if self._buffer is not None:
+            self._buffer.enqueue_delete(path)
+        else:
+            self.storage.delete(path)
+
     def _load_from_storage(self) -> None:
         """Load existing metadata from storage into the registry."""
-        for path, metadata in self.storage.load_all():
-            self.registry.add(path, metadata)
+        self.registry.add_many(self.storage.load_all())
 
     def _start_auto_sync(self) -> None:
-        """Start the auto sync thread."""
+        """Schedule periodic syncs on the shared background scheduler."""
+        self._sync_task = BackgroundTask(interval=self.sync_interval)
+        self._sync_task.start(self.sync)
 
-        def sync_thread():
-            while self.auto_sync:
-                self.sync()
-                time.sleep(self.sync_interval)
-
-        thread = threading.Thread(target=sync_thread, daemon=True)
-        thread.start()
-
-    def _run_plugins(self, path: str) -> Dict[str, Any]:
+    def _run_plugins(self, path: str, stat: Optional[os.stat_result] = None) -> Dict[str, Any]:
         """
         Run plugins on a file to extract metadata.
         
         Args:
             path: Path to the file.
+            stat: Result of os.stat(path), if already known.
             
         Returns:
             Metadata extracted by plugins.
+
+        Raises:
+            PluginError: If all supporting plugins fail.
         """
-        try:
-            return self.plugins.process_file(path)
-        except PluginError as e:
-            # Log error but don't propagate
-            print(f"Plugin error for {path}: {e}")
-            return {}
+        return self.plugins.process_file(path, stat)
+
+    def _run_plugins_many(
+        self, stats: Dict[str, os.stat_result]
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Run plugins on many files, in parallel if every plugin is thread-safe.
+
+        Args:
+            stats: Dictionary mapping paths to their stat results.
+
+        Returns:
+            Dictionary mapping each path to the metadata extracted by plugins.
+        """
+        futures = {
+            self.plugins.submit_file(path, stat): path for path, stat in stats.items()
+        }
+        results = {}
+
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                results[path] = future.result()
+            except PluginError as e:
+                # Log error but continue
+                logger.warning("Plugin error for %s: %s", path, e)
+                results[path] = {}
+
+        return results
 
     def _do_sync(self) -> Dict[str, int]:
         """
@@ -437,39 +550,44 @@ class FileMetaManager:
         """
         result = {"added": 0, "updated": 0, "removed": 0}
 
-        # Get all registered paths
-        registered_paths = set(self.registry.get_all_paths())
-        existing_paths = set()
-
-        # Check each registered path
-        for path in registered_paths:
-            if os.path.exists(path):
-                existing_paths.add(path)
-
-                # Check if file was modified
-                system_meta = get_system_metadata(path)
-                current_meta = self.registry.get(path)
-
-                if current_meta["system"]["modified"] != system_meta["modified"]:
-                    # File was modified, update metadata
-                    current_meta["system"] = system_meta
-
-                    # Run plugins again
-                    try:
-                        plugin_metadata = self._run_plugins(path)
-                        if plugin_metadata:
-                            current_meta["plugin"] = plugin_metadata
-                    except PluginError:
-                        pass
-
-                    self.registry.update(path, current_meta)
-                    self.storage.save(path, current_meta)
-                    result["updated"] += 1
-            else:
+        # Stat every registered path once
+        stats = stat_many(self.registry.get_all_paths())
+        modified = []
+
+        for path, stat in stats.items():
+            if stat is None:
                 # File no longer exists
                 self.registry.remove(path)
-                self.storage.delete(path)
+                self._delete(path)
+                self._file_states.pop(path, None)
                 result["removed"] += 1
+                continue
+
+            # Check if file was modified; system metadata is only rebuilt
+            # for files that changed
+            current_meta = self.registry.get(path)
+
+            if current_meta["system"]["modified"] != format_time(stat.st_mtime):
+                modified.append((path, current_meta))
+
+        # Run plugins again for modified files
+        plugin_results = self._run_plugins_many(
+            {path: stats[path] for path, _ in modified}
+        )
+
+        for path, current_meta in modified:
+            # Build a new dict so the registry can unindex the old values
+            updated_meta = dict(current_meta)
+            updated_meta["system"] = get_system_metadata(path, stats[path])
+
+            plugin_metadata = plugin_results.get(path)
+            if plugin_metadata:
+                updated_meta["plugin"] = plugin_metadata
+
+            self.registry.update(path, updated_meta)
+            self._save(path, updated_meta)
+            self._file_states.pop(path, None)
+            result["updated"] += 1
 
         return result
 
@@ -480,12 +598,11 @@ class FileMetaManager:
         Returns:
             Number of orphaned entries removed.
         """
-        count = 0
+        missing = find_missing(self.registry.get_all_paths())
 
-        for path in self.registry.get_all_paths():
-            if not os.path.exists(path):
-                self.registry.remove(path)
-                self.storage.delete(path)
-                count += 1
+        for path in missing:
+            self.registry.remove(path)
+            self._delete(path)
+            self._file_states.pop(path, None)
 
-        return count
+        return len(missing)
@@ -3,16 +3,80 @@
 Plugin system for FileMetaLib.
 """
 
+import atexit
+import copy
 import os
 import threading
-from typing import Dict, List, Any, Optional, Set, Callable
+from typing import Dict, List, Any, Optional, Set, Callable, FrozenSet
 from abc import ABC, abstractmethod
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor
 
+from .concurrency import Cache
 from .exceptions import PluginError
 
 __all__ = ["FilePlugin", "PluginRegistry"]  # Add this line to explicitly export these classes
 
+# Worker pool shared by every PluginRegistry, created on first use
+_SHARED_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_SHARED_EXECUTOR_LOCK = threading.Lock()
+
+
+# Thread-local flag set on pool worker threads
+_worker_state = threading.local()
+
+
+def _mark_worker() -> None:
+    """Flag the current thread as a plugin pool worker."""
+    _worker_state.active = True
+
+
+def _run_inline(fn: Callable, *args) -> Future:
+    """
+    Run a function on the current thread.
+    
+    Args:
+        fn: Function to run.
+        *args: Arguments to pass to the function.
+        
+    Returns:
+        Completed future holding the result or the raised exception.
+    """
+    future = Future()
+    try:
+        future.set_result(fn(*args))
+    except Exception as e:
+        future.set_exception(e)
+    return future
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """
+    Get the process-wide plugin worker pool.
+    
+    Returns:
+        Shared thread pool, sized like the ThreadPoolExecutor default since
+        plugins are often I/O-bound.
+    """
+    global _SHARED_EXECUTOR
+    if _SHARED_EXECUTOR is None:
+        with _SHARED_EXECUTOR_LOCK:
+            if _SHARED_EXECUTOR is None:
+                _SHARED_EXECUTOR = ThreadPoolExecutor(
+                    max_workers=min(32, (os.cpu_count() or 1) + 4),
+                    thread_name_prefix="FileMetaLib-plugin",
+                    initializer=_mark_worker,
+                )
+    return _SHARED_EXECUTOR
+
+
+def _shutdown_executor() -> None:
+    """Shut down the shared worker pool at interpreter exit."""
+    if _SHARED_EXECUTOR is not None:
+        _SHARED_EXECUTOR.shutdown(wait=False)
+
+
+atexit.register(_shutdown_executor)
+
 
 class FilePlugin(ABC):
     """
@@ -50,6 +114,36 @@ class FilePlugin(ABC):
         """
         pass
     
+    def supports_ext(self, ext: str) -> Optional[bool]:
+        """
+        Check if the plugin supports files with an extension.
+        
+        Lets the dispatcher decide without calling supports() on the full path.
+        
+        Args:
+            ext: Lowercase extension including the leading dot, e.g. ".jpg".
+            
+        Returns:
+            Whether the plugin supports the extension, or None if that cannot
+            be decided from the extension alone.
+        """
+        return None
+    
+    @classmethod
+    def extensions(cls) -> FrozenSet[str]:
+        """
+        Get the file extensions handled by the plugin.
+        
+        Plugins that declare their extensions are dispatched by a dictionary
+        lookup and never have supports() called. Plugins that return an empty
+        set are probed with supports() for every file.
+        
+        Returns:
+            Extensions such as ".jpg"; case and the leading dot are normalized
+            at registration.
+        """
+        return frozenset()
+    
     @property
     def priority(self) -> int:
         """
@@ -61,6 +155,20 @@ class FilePlugin(ABC):
             Plugin priority.
         """
         return 0
+    
+    @property
+    def thread_safe(self) -> bool:
+        """
+        Whether extract() may run on several threads at once.
+        
+        Plugins are run one at a time unless every plugin involved returns
+        True, in which case the plugins for a file run in parallel and sync
+        processes several files at once.
+        
+        Returns:
+            Whether the plugin is thread-safe.
+        """
+        return False
 
 
 class PluginRegistry:
@@ -70,15 +178,31 @@ class PluginRegistry:
     This class manages file plugins and dispatches file processing to them.
     """
     
-    def __init__(self, max_workers: int = 4):
+    def __init__(self, max_workers: int = 4, cache_size: int = 4096):
         """
         Initialize a new PluginRegistry.
         
         Args:
-            max_workers: Maximum number of worker threads.
+            max_workers: Kept for backward compatibility. Plugins run on a
+                process-wide worker pool.
+            cache_size: Maximum number of memoized extraction results.
         """
         self._plugins = []
-        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._rank = {}
+        
+        # Extension -> plugins declaring it, and plugins that must be probed
+        self._by_ext = {}
+        self._generic = []
+        
+        # (path, mtime_ns, size) -> extracted metadata
+        self._cache = Cache(max_size=cache_size, ttl=0)
+        
+        # Whether every registered plugin may run concurrently
+        self._thread_safe = True
+        
+        # Bumped on every registration so callers can tell when results
+        # extracted earlier are missing a plugin
+        self.version = 0
     
     def register(self, plugin: FilePlugin) -> None:
         """
@@ -88,16 +212,82 @@ class PluginRegistry:
             plugin: Plugin to register.
         """
         self._plugins.append(plugin)
+        self.version += 1
         
         # Sort plugins by priority (descending)
         self._plugins.sort(key=lambda p: p.priority, reverse=True)
+        
+        # Position of each plugin in dispatch order, used to order buckets
+        self._rank = {id(p): i for i, p in enumerate(self._plugins)}
+        
+        # Memoized results do not include the new plugin
+        self._cache.clear()
+        
+        self._thread_safe = self._thread_safe and plugin.thread_safe
+        
+        extensions = plugin.extensions()
+        if extensions:
+            for ext in extensions:
+                ext = ext.lower()
+                if not ext.startswith("."):
+                    ext = "." + ext
+                bucket = self._by_ext.setdefault(ext, [])
+                bucket.append(plugin)
+                bucket.sort(key=self._plugin_rank)
+        else:
+            self._generic.append(plugin)
+            self._generic.sort(key=self._plugin_rank)
+    
+    def _plugin_rank(self, plugin: FilePlugin) -> int:
+        """
+        Get a plugin's position in dispatch order.
+        
+        Args:
+            plugin: Registered plugin.
+            
+        Returns:
+            Index of the plugin in the priority-sorted plugin list.
+        """
+        return self._rank[id(plugin)]
+    
+    def _find_plugins(self, path: str) -> List[FilePlugin]:
+        """
+        Find the plugins supporting a file, highest priority first.
+        
+        Args:
+            path: Path to the file.
+            
+        Returns:
+            Supporting plugins.
+        """
+        ext = os.path.splitext(path)[1].lower()
+        by_ext = self._by_ext.get(ext, [])
+        
+        if not self._generic:
+            return by_ext
+        
+        probed = []
+        for plugin in self._generic:
+            supported = plugin.supports_ext(ext)
+            if supported is None:
+                supported = plugin.supports(path)
+            if supported:
+                probed.append(plugin)
+        if not by_ext:
+            return probed
+        
+        return sorted(by_ext + probed, key=self._plugin_rank)
     
-    def process_file(self, path: str) -> Dict[str, Any]:
+    def process_file(self, path: str, stat: Optional[os.stat_result] = None) -> Dict[str, Any]:
         """
         Process a file with all supporting plugins.
         
+        Results are memoized by (path, mtime, size), so unchanged files are
+        not extracted again.
+        
         Args:
             path: Path to the file.
+            stat: Result of os.stat(path), if the caller already has it.
             
         Returns:
             Combined metadata from all plugins.
@@ -105,22 +295,43 @@ class PluginRegistry:
         Raises:
             PluginError: If all plugins fail.
         """
-        if not os.path.exists(path):
-            raise PluginError(f"File not found: {path}")
+        if stat is None:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                raise PluginError(f"File not found: {path}")
         
         # Find supporting plugins
-        supporting_plugins = [p for p in self._plugins if p.supports(path)]
+        supporting_plugins = self._find_plugins(path)
         
         if not supporting_plugins:
             return {}  # No plugins support this file type
         
-        # Process file with each plugin
+        cache_key = (path, stat.st_mtime_ns, stat.st_size)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return copy.deepcopy(cached)
+        
+        # Process file with each plugin, in parallel when several apply and
+        # all of them are thread-safe. Pool workers run their plugins serially
+        # so they never block waiting on tasks queued behind them.
+        if (
+            len(supporting_plugins) > 1
+            and not getattr(_worker_state, "active", False)
+            and all(p.thread_safe for p in supporting_plugins)
+        ):
+            executor = _get_executor()
+            outcomes = [executor.submit(p.extract, path) for p in supporting_plugins]
+        else:
+            outcomes = [_run_inline(p.extract, path) for p in supporting_plugins]
+        
+        # Merge in priority order so conflicts resolve as with serial runs
         results = {}
         errors = []
         
-        for plugin in supporting_plugins:
+        for plugin, outcome in zip(supporting_plugins, outcomes):
             try:
-                metadata = plugin.extract(path)
+                metadata = outcome.result()
                 if metadata:
                     results.update(metadata)
             except Exception as e:
@@ -130,8 +341,28 @@ class PluginRegistry:
         if errors and not results:
             raise PluginError(f"All plugins failed: {'; '.join(errors)}")
         
+        self._cache.set(cache_key, copy.deepcopy(results))
+        
         return results
     
+    def submit_file(self, path: str, stat: Optional[os.stat_result] = None) -> Future:
+        """
+        Process a file on the worker pool.
+        
+        If any registered plugin is not thread-safe, the file is processed
+        on the calling thread instead, so plugins never run concurrently.
+        
+        Args:
+            path: Path to the file.
+            stat: Result of os.stat(path), if the caller already has it.
+            
+        Returns:
+            Future resolving to the combined metadata from all plugins.
+        """
+        if not self._thread_safe:
+            return _run_inline(self.process_file, path, stat)
+        return _get_executor().submit(self.process_file, path, stat)
+    
     def process_file_async(self, path: str, callback: Callable[[Dict[str, Any]], None]) -> None:
         """
         Process a file asynchronously.
@@ -147,4 +378,13 @@ class PluginRegistry:
             except Exception as e:
                 callback({"error": str(e)})
         
-        self._executor.submit(_process)
\ No newline at end of file
+        _get_executor().submit(_process)
+    
+    def shutdown(self) -> None:
+        """
+        Release resources held by the registry.
+        
+        The worker pool is shared by all registries and shut down at exit,
+        so there is nothing to release.
+        """
+        pass
\ No newline at end of file
@@ -3,11 +3,136 @@
 Query engine for FileMetaLib.
 """
 
+import operator
 import re
-from typing import Dict, List, Any, Set, Callable, Iterable, Optional
+from functools import lru_cache, partial
+from typing import Dict, List, Any, Set, Callable, Iterable, Iterator, Optional
 
+from .concurrency import Cache
 from .registry import MetadataRegistry
 
+# Marker for a field a path does not have
+_MISSING = object()
+
+
+def _numeric(compare: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+    """Wrap a comparison so it only matches when both operands are numbers."""
+    def match(field_value: Any, value: Any) -> bool:
+        return (
+            isinstance(field_value, (int, float))
+            and isinstance(value, (int, float))
+            and compare(field_value, value)
+        )
+    return match
+
+
+def _is_nan(value: Any) -> bool:
+    """Check if a value is a float NaN."""
+    return isinstance(value, float) and value != value
+
+
+def _contains(container: Any, value: Any) -> bool:
+    """Membership test where a value of the wrong type is never a member."""
+    try:
+        return value in container
+    except TypeError:
+        return False
+
+
+# Field operators that compare a single value directly, without going
+# through the list-based _op_* implementations
+_SCALAR_OPS = {
+    "$eq": operator.eq,
+    "$ne": operator.ne,
+    "$gt": _numeric(operator.gt),
+    "$gte": _numeric(operator.ge),
+    "$lt": _numeric(operator.lt),
+    "$lte": _numeric(operator.le),
+    "$in": lambda field_value, value: _contains(value, field_value),
+    "$nin": lambda field_value, value: not _contains(value, field_value),
+}
+
+
+def _in_set(field_value: Any, values: frozenset) -> bool:
+    """Membership in a frozenset; unhashable values are never members."""
+    try:
+        return field_value in values
+    except TypeError:
+        return False
+
+
+def _not_in_set(field_value: Any, values: frozenset) -> bool:
+    """Non-membership in a frozenset; unhashable values are never members."""
+    return not _in_set(field_value, values)
+
+
+# Set-based matchers for $in and $nin with hashable operands
+_SET_OPS = {"$in": _in_set, "$nin": _not_in_set}
+
+
+def _search_compiled(field_value: Any, pattern: "re.Pattern") -> bool:
+    """Match a field value against an already compiled regex."""
+    if not isinstance(field_value, str):
+        return False
+
+    try:
+        return pattern.search(field_value) is not None
+    except TypeError:
+        # Bytes pattern
+        return False
+
+
+@lru_cache(maxsize=256)
+def _compile_regex(pattern: str) -> "re.Pattern":
+    """Compile a regex pattern, memoized across queries."""
+    return re.compile(pattern)
+
+
+@lru_cache(maxsize=1024)
+def _split_field(key: str) -> tuple:
+    """Split a field key into (section, field), memoized across queries."""
+    if "." in key:
+        section, field = key.split(".", 1)
+    else:
+        section, field = "user", key
+
+    return section, field
+
+
+# Scalar types that can appear in a cacheable query
+_CACHEABLE_SCALARS = (str, int, float, bool, type(None))
+
+
+def _cache_key(value: Any) -> tuple:
+    """
+    Build a hashable key for a query value that preserves its types.
+
+    Equal keys mean equal queries: lists and tuples, 1 and True, and strings
+    that look like other values all get different keys.
+
+    Args:
+        value: Query or query value.
+
+    Returns:
+        Tuple of the value's type and its contents.
+
+    Raises:
+        TypeError: If the value contains anything but dicts, lists, tuples,
+            sets and scalars.
+    """
+    kind = type(value)
+
+    if kind is dict:
+        return kind, tuple(sorted((k, _cache_key(v)) for k, v in value.items()))
+    if kind is list or kind is tuple:
+        return kind, tuple(map(_cache_key, value))
+    if kind is set or kind is frozenset:
+        return kind, frozenset(map(_cache_key, value))
+    if kind in _CACHEABLE_SCALARS:
+        return kind, value
+
+    raise TypeError(f"Uncacheable query value: {value!r}")
+
 
 class QueryEngine:
     """
@@ -15,6 +140,28 @@ class QueryEngine:
     
     This class processes queries and returns matching files.
     """
+
+    # Relative cost of evaluating a field operator, used to run cheap and
+    # selective conditions first
+    _OP_COSTS = {
+        "$eq": 0,
+        "$in": 0,
+        "$ne": 1,
+        "$nin": 1,
+        "$gt": 1,
+        "$gte": 1,
+        "$lt": 1,
+        "$lte": 1,
+        "$exists": 1,
+        "$type": 1,
+        "$startswith": 1,
+        "$endswith": 1,
+        "$contains": 2,
+        "$regex": 3,
+    }
+
+    # Cost of a nested $and/$or/$not condition
+    _LOGICAL_COST = 2
     
     def __init__(self, registry: MetadataRegistry):
         """
@@ -24,26 +171,44 @@ class QueryEngine:
             registry: Metadata registry to query.
         """
         self.registry = registry
+
+        # Results of recent queries, keyed by registry version and query
+        self._result_cache = Cache(max_size=256, ttl=0)
         
-        # Register operators
+        # Register field operators as matchers of a single field value
+        self._matchers = dict(_SCALAR_OPS)
+        self._matchers.update({
+            "$contains": self._check_contains,
+            "$startswith": self._check_startswith,
+            "$endswith": self._check_endswith,
+            "$regex": self._check_regex,
+            "$exists": self._check_exists,
+            "$type": self._check_type,
+        })
+
+        # Register operators usable at the top level of a query
         self._operators = {
-            "$eq": self._op_eq,
-            "$ne": self._op_ne,
-            "$gt": self._op_gt,
-            "$gte": self._op_gte,
-            "$lt": self._op_lt,
-            "$lte": self._op_lte,
-            "$in": self._op_in,
-            "$nin": self._op_nin,
-            "$contains": self._op_contains,
-            "$startswith": self._op_startswith,
-            "$endswith": self._op_endswith,
-            "$regex": self._op_regex,
-            "$exists": self._op_exists,
-            "$type": self._op_type,
+            op: partial(self._op_match, match) for op, match in self._matchers.items()
+        }
+        self._operators.update({
             "$and": self._op_and,
             "$or": self._op_or,
             "$not": self._op_not
+        })
+
+        # Operators that can be answered from the registry indexes. Each returns
+        # the set of matching paths, or None if the index cannot answer it.
+        self._index_ops = {
+            "$eq": self._index_eq,
+            "$ne": self._index_ne,
+            "$in": self._index_in,
+            "$nin": self._index_nin,
+            "$gt": self._index_gt,
+            "$gte": self._index_gte,
+            "$lt": self._index_lt,
+            "$lte": self._index_lte,
+            "$startswith": self._index_startswith,
+            "$endswith": self._index_endswith,
         }
     
     def execute(self, query: Dict[str, Any]) -> Iterable[str]:
@@ -56,252 +221,461 @@ class QueryEngine:
         Returns:
             Iterable of file paths matching the query.
         """
-        # Get all paths
-        all_paths = set(self.registry.get_all_paths())
-        
-        # Apply filters
-        result_paths = self._apply_filters(all_paths, query)
+        # Results are cached per registry version, so any change to the
+        # registry makes earlier entries unreachable
+        version = self.registry.version
+        try:
+            key = (version, _cache_key(query))
+        except TypeError:
+            # Values other than JSON-like data and sets are not cached
+            key = None
+
+        if key is not None:
+            cached = self._result_cache.get(key)
+            if cached is not None:
+                return set(cached)
+
+        # Apply filters, starting from all paths; the full path set is only
+        # built if an index lookup cannot narrow it first
+        result_paths = self._apply_filters(None, query)
+
+        if key is not None:
+            self._result_cache.set(key, frozenset(result_paths))
         
         return result_paths
+
+    def execute_iter(self, query: Dict[str, Any]) -> Iterator[str]:
+        """
+        Execute a query, yielding matching paths one at a time.
+        
+        Index-backed conditions narrow the candidates up front; the remaining
+        field conditions are tested per path as results are consumed, so
+        taking the first few matches does not scan the whole registry.
+        Queries with logical operators at the top level are evaluated in
+        full first. The registry must not change while iterating.
+        
+        Args:
+            query: Query dictionary.
+            
+        Yields:
+            File paths matching the query.
+        """
+        if any(key.startswith("$") for key in query):
+            yield from self.execute(query)
+            return
+
+        paths = None
+        checks = []
+        for key, value in sorted(query.items(), key=self._condition_cost):
+            if paths is not None and not paths:
+                return
+            paths = self._apply_field(paths, key, value, checks)
+
+        if checks:
+            yield from self._iter_checks(paths, checks)
+        else:
+            yield from self._all_paths(paths)
     
-    def _apply_filters(self, paths: Set[str], query: Dict[str, Any]) -> Set[str]:
+    def _apply_filters(self, paths: Optional[Set[str]], query: Dict[str, Any]) -> Set[str]:
         """
         Apply filters to paths.
         
         Args:
-            paths: Set of paths to filter.
+            paths: Set of paths to filter, or None for all registered paths.
             query: Query dictionary.
             
         Returns:
             Filtered set of paths.
         """
-        result = paths.copy()
+        # Every filter returns a new set, so the input is never modified
+        # and does not need to be copied
+        result = paths
+
+        # Conditions the index cannot answer, checked in one pass at the end
+        checks = []
         
-        for key, value in query.items():
+        # Cheapest conditions first; stop as soon as nothing is left to filter
+        for key, value in sorted(query.items(), key=self._condition_cost):
+            if result is not None and not result:
+                break
+
             if key.startswith("$"):
                 # Operator at top level
-                if key in self._operators:
-                    result = self._operators[key](result, value)
-            else:
-                # Field query
-                section, field = self._parse_field(key)
-                
-                if isinstance(value, dict) and all(k.startswith("$") for k in value.keys()):
-                    # Operator query
-                    for op, op_value in value.items():
-                        if op in self._operators:
-                            result = self._filter_by_field_op(result, section, field, op, op_value)
-                else:
-                    # Simple equality query
-                    result = self._filter_by_field_eq(result, section, field, value)
+                if key == "$and":
+                    # $and narrows from None itself, so the full path set may never be built
+                    result = self._op_and(result, value)
+                elif key in self._operators:
+                    result = self._operators[key](self._all_paths(result), value)
+                continue
+
+            result = self._apply_field(result, key, value, checks)
+
+        if checks and (result is None or result):
+            return self._filter_by_checks(result, checks)
         
-        return result
-    
-    def _parse_field(self, key: str) -> tuple:
+        return self._all_paths(result)
+
+    def _apply_field(
+        self, paths: Optional[Set[str]], key: str, value: Any, checks: List[tuple]
+    ) -> Optional[Set[str]]:
         """
-        Parse a field key into section and field.
+        Apply a field condition.
+        
+        Operators the index can answer narrow the path set right away; the
+        rest are added to checks for a later pass.
         
         Args:
+            paths: Set of paths to filter, or None for all registered paths.
             key: Field key.
+            value: Field value or dictionary of operators.
+            checks: List of pending checks, extended in place.
             
         Returns:
-            Tuple of (section, field).
+            Narrowed set of paths, or None if still all registered paths.
         """
-        if "." in key:
-            section, field = key.split(".", 1)
+        section, field = self._parse_field(key)
+        
+        explicit = isinstance(value, dict) and all(k.startswith("$") for k in value.keys())
+        if explicit:
+            # Operator query
+            conditions = [(op, op_value) for op, op_value in value.items() if op in self._operators]
         else:
-            section, field = "user", key
+            # Simple equality query
+            conditions = [("$eq", value)]
+
+        for op, op_value in conditions:
+            match = self._matchers.get(op)
+            if match is None:
+                # Logical operators cannot be applied to a field
+                return set()
+
+            if explicit and _is_nan(op_value):
+                # Operators compare with ==, which NaN never passes, while an
+                # index lookup finds the identical NaN object
+                matched = None
+            else:
+                matched = self._filter_by_index(section, field, op, op_value)
+            if matched is None:
+                checks.append(self._make_check(section, field, op, match, op_value))
+            elif paths is None:
+                # Index results are new sets of registered paths
+                paths = matched
+            else:
+                paths = paths.intersection(matched)
+
+        return paths
+
+    def _all_paths(self, paths: Optional[Set[str]]) -> Set[str]:
+        """
+        Resolve a path set, where None stands for all registered paths.
         
-        return section, field
-    
-    def _filter_by_field_eq(self, paths: Set[str], section: str, field: str, value: Any) -> Set[str]:
+        Args:
+            paths: Set of paths, or None.
+            
+        Returns:
+            The given set, or a new set of all registered paths.
+        """
+        if paths is None:
+            return set(self.registry.entries())
+        return paths
+
+    def _condition_cost(self, condition: tuple) -> tuple:
+        """
+        Estimate the cost of a query condition.
+        
+        Args:
+            condition: Tuple of (key, value) from a query dictionary.
+            
+        Returns:
+            Tuple of (rank, estimated matches); lower runs first.
         """
-        Filter paths by field equality.
+        key, value = condition
+
+        if key.startswith("$"):
+            return self._LOGICAL_COST, 0
+
+        if isinstance(value, dict) and all(k.startswith("$") for k in value.keys()):
+            ops = value
+        else:
+            ops = {"$eq": value}
+
+        rank = max((self._OP_COSTS.get(op, 1) for op in ops), default=0)
+
+        section, field = self._parse_field(key)
+        if not self.registry.has_index(section, field):
+            # Without an index every condition is a scan
+            return max(rank, 1), 0
+
+        # Among indexed conditions, the one with the fewest matches goes first
+        return rank, self._estimate_matches(section, field, ops)
+
+    def _estimate_matches(self, section: str, field: str, ops: Dict[str, Any]) -> int:
+        """
+        Estimate how many paths match a field condition, from index bucket sizes.
         
         Args:
-            paths: Set of paths to filter.
             section: Metadata section.
             field: Field name.
-            value: Field value.
+            ops: Dictionary of operators to operator values.
             
         Returns:
-            Filtered set of paths.
+            Estimated number of matching paths.
         """
-        # Try to use index if available
-        if isinstance(value, (str, int, float, bool)) or value is None:
-            indexed_paths = self.registry.find_by_field(section, field, value)
-            if indexed_paths:
-                return paths.intersection(indexed_paths)
-        
-        # Fall back to manual filtering
-        result = set()
+        estimate = len(self.registry.entries())
+
+        for op, value in ops.items():
+            if op == "$eq" and self._is_scalar(value):
+                estimate = min(estimate, self.registry.count_by_field(section, field, value))
+            elif (
+                op == "$in"
+                and isinstance(value, (list, tuple, set, frozenset))
+                and all(self._is_scalar(v) for v in value)
+            ):
+                matches = sum(self.registry.count_by_field(section, field, v) for v in value)
+                estimate = min(estimate, matches)
+
+        return estimate
+    
+    def _parse_field(self, key: str) -> tuple:
+        """
+        Parse a field key into section and field.
         
-        for path in paths:
-            metadata = self.registry.get(path)
-            if not metadata or section not in metadata:
-                continue
-            
-            section_data = metadata[section]
-            if field not in section_data:
-                continue
+        Args:
+            key: Field key.
             
-            if section_data[field] == value:
-                result.add(path)
-        
-        return result
+        Returns:
+            Tuple of (section, field).
+        """
+        return _split_field(key)
     
-    def _filter_by_field_op(self, paths: Set[str], section: str, field: str, op: str, value: Any) -> Set[str]:
+    def _filter_by_index(self, section: str, field: str, op: str, value: Any) -> Optional[Set[str]]:
         """
-        Filter paths by field operation.
+        Answer a field condition from the registry indexes.
         
         Args:
-            paths: Set of paths to filter.
             section: Metadata section.
             field: Field name.
-            op: Operation.
-            value: Operation value.
+            op: Operator.
+            value: Operator value.
             
         Returns:
-            Filtered set of paths.
+            Set of all paths matching the condition, or None if the index
+            cannot answer it.
         """
-        result = set()
-        
-        for path in paths:
-            metadata = self.registry.get(path)
-            if not metadata or section not in metadata:
-                continue
-            
-            section_data = metadata[section]
-            if field not in section_data:
-                continue
-            
-            field_value = section_data[field]
-            
-            if self._apply_operator(op, field_value, value):
-                result.add(path)
-        
-        return result
+        index_op = self._index_ops.get(op)
+        if index_op is None or not self.registry.has_index(section, field):
+            return None
+
+        return index_op(section, field, value)
     
-    def _apply_operator(self, op: str, field_value: Any, value: Any) -> bool:
+    def _make_check(
+        self, section: str, field: str, op: str, match: Callable[[Any, Any], bool], value: Any
+    ) -> tuple:
         """
-        Apply an operator to a field value.
+        Prepare a field condition for _filter_by_checks.
+        
+        $in and $nin operands are converted to a frozenset once, so each
+        path is tested with a hash probe instead of a list scan. $regex
+        patterns are compiled once instead of looked up for every path.
         
         Args:
+            section: Metadata section.
+            field: Field name.
             op: Operator.
-            field_value: Field value.
-            value: Value to compare with.
+            match: Matcher for the operator.
+            value: Operator value.
             
         Returns:
-            Whether the operator matches.
+            Tuple of (section, field, matcher, value).
         """
-        if op not in self._operators:
-            return False
+        if op in _SET_OPS and isinstance(value, (list, tuple, set)):
+            try:
+                return section, field, _SET_OPS[op], frozenset(value)
+            except TypeError:
+                # Unhashable items; keep the sequence
+                pass
+
+        if op == "$regex":
+            try:
+                return section, field, _search_compiled, _compile_regex(value)
+            except Exception:
+                # Invalid pattern; the generic matcher never matches
+                pass
+
+        return section, field, match, value
+
+    def _filter_by_checks(self, paths: Optional[Set[str]], checks: List[tuple]) -> Set[str]:
+        """
+        Filter paths by field conditions in a single pass.
         
-        # Special handling for logical operators
-        if op in ["$and", "$or", "$not"]:
-            return False  # These should be handled at the top level
+        Args:
+            paths: Set of paths to filter, or None for all registered paths.
+            checks: List of (section, field, matcher, value) tuples, all of
+                which must match.
+            
+        Returns:
+            Filtered set of paths.
+        """
+        return set(self._iter_checks(paths, checks))
+
+    def _iter_checks(self, paths: Optional[Set[str]], checks: List[tuple]) -> Iterator[str]:
+        """
+        Yield the paths that pass all field conditions.
+        
+        Args:
+            paths: Set of paths to filter, or None for all registered paths.
+            checks: List of (section, field, matcher, value) tuples, all of
+                which must match.
+            
+        Yields:
+            Matching paths.
+        """
+        # Read each field from copies of the registry's per-field value maps,
+        # one lookup per path and check, so concurrent writes cannot disturb
+        # the loop
+        lookups = []
+        candidates = None
+        for section, field, match, value in checks:
+            values = self.registry.field_values(section, field)
+            if values is None:
+                break
+            lookups.append((values.get, match, value))
+            # A path missing the field never matches, so without a path set
+            # only the smallest value map needs to be walked
+            if paths is None and (candidates is None or len(values) < len(candidates)):
+                candidates = values
+        else:
+            for path in candidates if paths is None else paths:
+                for get_value, match, value in lookups:
+                    field_value = get_value(path, _MISSING)
+                    if field_value is _MISSING or not match(field_value, value):
+                        break
+                else:
+                    yield path
+
+            return
+
+        # Some section is not tracked by the registry; read whole metadata
+        # from a snapshot, which concurrent writes leave unchanged
+        entries = self.registry.snapshot()
+        get_metadata = entries.get
         
-        # Apply the operator
-        return self._operators[op]([field_value], value)
+        for path in entries if paths is None else paths:
+            metadata = get_metadata(path)
+            if not metadata:
+                continue
+
+            for section, field, match, value in checks:
+                if section not in metadata:
+                    break
+
+                section_data = metadata[section]
+                if field not in section_data or not match(section_data[field], value):
+                    break
+            else:
+                yield path
+
+    # Index-backed operator implementations
+
+    def _index_eq(self, section: str, field: str, value: Any) -> Optional[Set[str]]:
+        """Equal operator using the field index."""
+        if not self._is_scalar(value):
+            return None
+        return self.registry.find_by_field(section, field, value)
+
+    def _index_ne(self, section: str, field: str, value: Any) -> Optional[Set[str]]:
+        """Not equal operator using the field index."""
+        if not self._is_scalar(value):
+            return None
+        return self.registry.paths_with_field(section, field) - self.registry.find_by_field(section, field, value)
+
+    def _index_in(self, section: str, field: str, value: Any) -> Optional[Set[str]]:
+        """In operator using the field index."""
+        if not isinstance(value, (list, tuple, set, frozenset)):
+            return None
+        if not all(self._is_scalar(v) for v in value):
+            return None
+        result = set()
+        for v in value:
+            result.update(self.registry.find_by_field(section, field, v))
+        return result
+
+    def _index_nin(self, section: str, field: str, value: Any) -> Optional[Set[str]]:
+        """Not in operator using the field index."""
+        excluded = self._index_in(section, field, value)
+        if excluded is None:
+            return None
+        return self.registry.paths_with_field(section, field) - excluded
+
+    def _index_gt(self, section: str, field: str, value: Any) -> Optional[Set[str]]:
+        """Greater than operator using the field index."""
+        if not self._is_number(value):
+            return set()
+        return self.registry.find_by_range(section, field, lower=value, include_lower=False)
+
+    def _index_gte(self, section: str, field: str, value: Any) -> Optional[Set[str]]:
+        """Greater than or equal operator using the field index."""
+        if not self._is_number(value):
+            return set()
+        return self.registry.find_by_range(section, field, lower=value)
+
+    def _index_lt(self, section: str, field: str, value: Any) -> Optional[Set[str]]:
+        """Less than operator using the field index."""
+        if not self._is_number(value):
+            return set()
+        return self.registry.find_by_range(section, field, upper=value, include_upper=False)
+
+    def _index_lte(self, section: str, field: str, value: Any) -> Optional[Set[str]]:
+        """Less than or equal operator using the field index."""
+        if not self._is_number(value):
+            return set()
+        return self.registry.find_by_range(section, field, upper=value)
+
+    def _index_startswith(self, section: str, field: str, value: Any) -> Optional[Set[str]]:
+        """Starts with operator using the field index."""
+        if not isinstance(value, str):
+            return None
+        return self.registry.find_by_prefix(section, field, value)
+
+    def _index_endswith(self, section: str, field: str, value: Any) -> Optional[Set[str]]:
+        """Ends with operator using the field index."""
+        if not isinstance(value, str):
+            return None
+        return self.registry.find_by_suffix(section, field, value)
     
     # Operator implementations
     
-    def _op_eq(self, values: Any, value: Any) -> Any:
-        """Equal operator."""
-        if isinstance(values, set):
-            return {path for path in values if self._get_field_value(path, value) == value}
-        return values[0] == value if values else False
-    
-    def _op_ne(self, values: Any, value: Any) -> Any:
-        """Not equal operator."""
-        if isinstance(values, set):
-            return {path for path in values if self._get_field_value(path, value) != value}
-        return values[0] != value if values else False
-    
-    def _op_gt(self, values: Any, value: Any) -> Any:
-        """Greater than operator."""
-        if isinstance(values, set):
-            return {path for path in values if self._compare_numeric(self._get_field_value(path, value), value, lambda a, b: a > b)}
-        return self._compare_numeric(values[0], value, lambda a, b: a > b) if values else False
-    
-    def _op_gte(self, values: Any, value: Any) -> Any:
-        """Greater than or equal operator."""
-        if isinstance(values, set):
-            return {path for path in values if self._compare_numeric(self._get_field_value(path, value), value, lambda a, b: a >= b)}
-        return self._compare_numeric(values[0], value, lambda a, b: a >= b) if values else False
-    
-    def _op_lt(self, values: Any, value: Any) -> Any:
-        """Less than operator."""
-        if isinstance(values, set):
-            return {path for path in values if self._compare_numeric(self._get_field_value(path, value), value, lambda a, b: a < b)}
-        return self._compare_numeric(values[0], value, lambda a, b: a < b) if values else False
-    
-    def _op_lte(self, values: Any, value: Any) -> Any:
-        """Less than or equal operator."""
-        if isinstance(values, set):
-            return {path for path in values if self._compare_numeric(self._get_field_value(path, value), value, lambda a, b: a <= b)}
-        return self._compare_numeric(values[0], value, lambda a, b: a <= b) if values else False
-    
-    def _op_in(self, values: Any, value: Any) -> Any:
-        """In operator."""
-        if isinstance(values, set):
-            return {path for path in values if self._get_field_value(path, value) in value}
-        return values[0] in value if values else False
-    
-    def _op_nin(self, values: Any, value: Any) -> Any:
-        """Not in operator."""
-        if isinstance(values, set):
-            return {path for path in values if self._get_field_value(path, value) not in value}
-        return values[0] not in value if values else False
+    def _op_match(self, match: Callable[[Any, Any], bool], paths: Set[str], value: Any) -> Set[str]:
+        """Field operator used at the top level, applied to whole metadata."""
+        # Paths without metadata are compared as the operand itself
+        get_metadata = self.registry.entries().get
+        return {path for path in paths if match(get_metadata(path) or value, value)}
     
-    def _op_contains(self, values: Any, value: Any) -> Any:
-        """Contains operator."""
-        if isinstance(values, set):
-            return {path for path in values if self._check_contains(self._get_field_value(path, value), value)}
-        return self._check_contains(values[0], value) if values else False
-    
-    def _op_startswith(self, values: Any, value: Any) -> Any:
-        """Starts with operator."""
-        if isinstance(values, set):
-            return {path for path in values if self._check_startswith(self._get_field_value(path, value), value)}
-        return self._check_startswith(values[0], value) if values else False
-    
-    def _op_endswith(self, values: Any, value: Any) -> Any:
-        """Ends with operator."""
-        if isinstance(values, set):
-            return {path for path in values if self._check_endswith(self._get_field_value(path, value), value)}
-        return self._check_endswith(values[0], value) if values else False
-    
-    def _op_regex(self, values: Any, value: Any) -> Any:
-        """Regex operator."""
-        if isinstance(values, set):
-            return {path for path in values if self._check_regex(self._get_field_value(path, value), value)}
-        return self._check_regex(values[0], value) if values else False
-    
-    def _op_exists(self, values: Any, value: Any) -> Any:
-        """Exists operator."""
-        if isinstance(values, set):
-            return {path for path in values if (self._get_field_value(path, value) is not None) == value}
-        return (values[0] is not None) == value if values else False
-    
-    def _op_type(self, values: Any, value: Any) -> Any:
-        """Type operator."""
-        if isinstance(values, set):
-            return {path for path in values if self._check_type(self._get_field_value(path, value), value)}
-        return self._check_type(values[0], value) if values else False
-    
-    def _op_and(self, paths: Set[str], value: List[Dict[str, Any]]) -> Set[str]:
-        """And operator."""
+    def _op_and(self, paths: Optional[Set[str]], value: List[Dict[str, Any]]) -> Set[str]:
+        """And operator; paths may be None for all registered paths."""
         result = paths
-        for condition in value:
+        for condition in sorted(value, key=self._query_cost):
+            if result is not None and not result:
+                break
             result = self._apply_filters(result, condition)
-        return result
+        return self._all_paths(result)
     
     def _op_or(self, paths: Set[str], value: List[Dict[str, Any]]) -> Set[str]:
         """Or operator."""
+        # Equality branches on one indexed field collapse into a single lookup
+        indexed = self._or_as_index_union(value)
+        if indexed is not None:
+            return paths.intersection(indexed)
+
         result = set()
-        for condition in value:
-            result.update(self._apply_filters(paths, condition))
+        remaining = paths
+        for condition in sorted(value, key=self._or_branch_order):
+            # Paths already matched by an earlier branch need not be tested again
+            matched = self._apply_filters(remaining, condition)
+            result.update(matched)
+            remaining = remaining - matched
+            if not remaining:
+                break
         return result
     
     def _op_not(self, paths: Set[str], value: Dict[str, Any]) -> Set[str]:
@@ -310,41 +684,103 @@ class QueryEngine:
         return paths - excluded
     
     # Helper methods
-    
-    def _get_field_value(self, path: str, default: Any = None) -> Any:
+
+    def _or_as_index_union(self, conditions: List[Dict[str, Any]]) -> Optional[Set[str]]:
+        """
+        Answer an $or of equality conditions on one field from the index.
+        
+        Args:
+            conditions: Branches of the $or operator.
+            
+        Returns:
+            Set of paths matching any branch, or None if the branches are
+            not all scalar equalities on the same indexed field.
         """
-        Get a field value from metadata.
+        key = None
+        values = []
+
+        for condition in conditions:
+            if not isinstance(condition, dict) or len(condition) != 1:
+                return None
+
+            (branch_key, branch_value), = condition.items()
+            if branch_key.startswith("$") or (key is not None and branch_key != key):
+                return None
+            key = branch_key
+
+            if isinstance(branch_value, dict) and list(branch_value) == ["$eq"]:
+                branch_value = branch_value["$eq"]
+                if _is_nan(branch_value):
+                    # Needs the == comparison of an explicit $eq
+                    return None
+            if not self._is_scalar(branch_value):
+                return None
+            values.append(branch_value)
+
+        if key is None:
+            return None
+
+        section, field = self._parse_field(key)
+        if not self.registry.has_index(section, field):
+            return None
+
+        result = set()
+        for branch_value in values:
+            result.update(self.registry.find_by_field(section, field, branch_value))
+        return result
+
+    def _or_branch_order(self, query: Dict[str, Any]) -> tuple:
+        """
+        Sort key for $or branches.
+        
+        Cheap branches run first, and among equally cheap ones the broadest,
+        so expensive branches only test the paths no earlier branch matched.
         
         Args:
-            path: Path to the file.
-            default: Default value if not found.
+            query: Branch query dictionary.
             
         Returns:
-            Field value.
+            Tuple of (rank, negated estimated matches).
         """
-        metadata = self.registry.get(path)
-        if not metadata:
-            return default
+        rank, estimate = self._query_cost(query)
+        return rank, -estimate
+
+    def _query_cost(self, query: Dict[str, Any]) -> tuple:
+        """
+        Estimate the cost of a query dictionary.
         
-        return metadata
+        Args:
+            query: Query dictionary.
+            
+        Returns:
+            Estimated cost of the most expensive condition.
+        """
+        return max(map(self._condition_cost, query.items()), default=(0, 0))
     
-    def _compare_numeric(self, a: Any, b: Any, op: Callable[[Any, Any], bool]) -> bool:
+    def _is_scalar(self, value: Any) -> bool:
         """
-        Compare two values numerically.
+        Check if a value is a scalar that the registry indexes.
         
         Args:
-            a: First value.
-            b: Second value.
-            op: Comparison operator.
+            value: Value to check.
             
         Returns:
-            Whether the comparison is true.
+            Whether the value is indexable.
         """
-        if not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
-            return False
+        return isinstance(value, (str, int, float, bool)) or value is None
+
+    def _is_number(self, value: Any) -> bool:
+        """
+        Check if a value can take part in a numeric comparison.
         
-        return op(a, b)
-    
+        Args:
+            value: Value to check.
+            
+        Returns:
+            Whether the value is a number other than NaN.
+        """
+        return isinstance(value, (int, float)) and value == value
+
     def _check_contains(self, a: Any, b: Any) -> bool:
         """
         Check if a contains b.
@@ -357,9 +793,9 @@ class QueryEngine:
             Whether a contains b.
         """
         if isinstance(a, (str, list, tuple, set)):
-            return b in a
+            return _contains(a, b)
         if isinstance(a, dict):
-            return b in a or b in a.values()
+            return _contains(a, b) or b in a.values()
         return False
     
     def _check_startswith(self, a: Any, b: Any) -> bool:
@@ -373,7 +809,14 @@ class QueryEngine:
         Returns:
             Whether a starts with b.
         """
-        return isinstance(a, str) and a.startswith(b)
+        if not isinstance(a, str):
+            return False
+
+        try:
+            return a.startswith(b)
+        except TypeError:
+            # Not a string or tuple of strings
+            return False
     
     def _check_endswith(self, a: Any, b: Any) -> bool:
         """
@@ -386,7 +829,14 @@ class QueryEngine:
         Returns:
             Whether a ends with b.
         """
-        return isinstance(a, str) and a.endswith(b)
+        if not isinstance(a, str):
+            return False
+
+        try:
+            return a.endswith(b)
+        except TypeError:
+            # Not a string or tuple of strings
+            return False
     
     def _check_regex(self, a: Any, b: Any) -> bool:
         """
@@ -403,10 +853,23 @@ class QueryEngine:
             return False
         
         try:
-            return re.search(b, a) is not None
+            return _compile_regex(b).search(a) is not None
         except:
             return False
     
+    def _check_exists(self, a: Any, b: Any) -> bool:
+        """
+        Check if the presence of a value matches b.
+        
+        Args:
+            a: Value.
+            b: Whether a value is expected.
+            
+        Returns:
+            Whether a is present exactly when b is true.
+        """
+        return (a is not None) == b
+    
     def _check_type(self, a: Any, b: Any) -> bool:
         """
         Check if a is of type b.
@@ -3,7 +3,15 @@
 Metadata registry for FileMetaLib.
 """
 
-from typing import Dict, List, Any, Set, Optional
+import bisect
+import math
+import threading
+from typing import Dict, List, Any, Iterable, Mapping, Set, Optional, Tuple
+
+try:
+    import immutables
+except ImportError:
+    immutables = None
 
 
 class MetadataRegistry:
@@ -11,16 +19,35 @@ class MetadataRegistry:
     In-memory index for metadata.
 
     This class maintains primary and secondary indexes for fast access to metadata.
+    Entries are treated as immutable once added: writers replace an entry with a
+    new dict rather than mutating it, so readers can use an entry without locking.
+
+    When immutables is installed the primary index is a persistent hash map:
+    each write publishes a new map that shares structure with the old one, so
+    snapshot() is O(1) instead of copying every entry.
     """
 
     def __init__(self):
         """Initialize a new MetadataRegistry."""
         # Primary index: path -> metadata
-        self._primary_index = {}
+        self._primary_index = immutables.Map() if immutables is not None else {}
 
         # Secondary indexes: field -> paths
         self._secondary_indexes = {"system": {}, "user": {}, "plugin": {}}
 
+        # Every value of every field, indexable or not: field -> path -> value
+        self._field_values = {"system": {}, "user": {}, "plugin": {}}
+
+        # Sorted values per (section, field) and kind, built on demand and
+        # kept up to date as values are added to or removed from the field index.
+        # Lists are edited in place, so they are only read or written while
+        # holding the lock.
+        self._sorted_values = {}
+        self._sorted_lock = threading.Lock()
+
+        # Bumped on every change so callers can tell when derived data is stale
+        self.version = 0
+
     def add(self, path: str, metadata: Dict[str, Any]) -> None:
         """
         Add metadata for a file.
@@ -29,11 +56,50 @@ class MetadataRegistry:
             path: Path to the file.
             metadata: Metadata to add.
         """
+        # Unindex the entry being replaced, if any
+        previous = self._primary_index.get(path)
+        if previous is not None:
+            self._remove_from_secondary_indexes(path, previous)
+
         # Add to primary index
-        self._primary_index[path] = metadata
+        self._set_primary(path, metadata)
 
         # Add to secondary indexes
         self._index_metadata(path, metadata)
+        self.version += 1
+
+    def add_many(self, items: Iterable[Tuple[str, Dict[str, Any]]]) -> int:
+        """
+        Add metadata for many files.
+
+        The primary index is updated once for the whole batch rather than once
+        per entry, which makes bulk loads much cheaper with immutables.
+
+        Args:
+            items: Iterable of (path, metadata) tuples.
+
+        Returns:
+            Number of entries added.
+        """
+        if immutables is not None:
+            primary = self._primary_index.mutate()
+        else:
+            primary = self._primary_index
+
+        count = 0
+        for path, metadata in items:
+            previous = primary.get(path)
+            if previous is not None:
+                self._remove_from_secondary_indexes(path, previous)
+            primary[path] = metadata
+            self._index_metadata(path, metadata)
+            count += 1
+
+        if immutables is not None:
+            self._primary_index = primary.finish()
+
+        self.version += 1
+        return count
 
     def get(self, path: str) -> Optional[Dict[str, Any]]:
         """
@@ -60,10 +126,11 @@ class MetadataRegistry:
             self._remove_from_secondary_indexes(path, self._primary_index[path])
 
         # Update primary index
-        self._primary_index[path] = metadata
+        self._set_primary(path, metadata)
 
         # Update secondary indexes
         self._index_metadata(path, metadata)
+        self.version += 1
 
     def remove(self, path: str) -> None:
         """
@@ -78,7 +145,38 @@ class MetadataRegistry:
 
         # Remove from primary index
         if path in self._primary_index:
-            del self._primary_index[path]
+            if immutables is not None:
+                self._primary_index = self._primary_index.delete(path)
+            else:
+                del self._primary_index[path]
+            self.version += 1
+
+    def snapshot(self) -> Mapping[str, Dict[str, Any]]:
+        """
+        Get a point-in-time view of the primary index.
+
+        Entries are shared with the registry, which callers must treat as
+        read-only. With immutables installed the current map is returned
+        as is; otherwise the index is copied.
+
+        Returns:
+            Mapping of paths to metadata.
+        """
+        if immutables is not None:
+            return self._primary_index
+        return dict(self._primary_index)
+
+    def entries(self) -> Mapping[str, Dict[str, Any]]:
+        """
+        Get the live primary index for read-only bulk lookups.
+
+        Unlike snapshot(), this never copies. Callers must not modify the
+        mapping or its entries.
+
+        Returns:
+            Mapping of paths to metadata.
+        """
+        return self._primary_index
 
     def get_all_paths(self) -> List[str]:
         """
@@ -114,6 +212,287 @@ class MetadataRegistry:
 
         return field_index[value].copy()
 
+    def count_by_field(self, section: str, field: str, value: Any) -> int:
+        """
+        Count paths by field value, without copying the index.
+
+        Args:
+            section: Metadata section ('system', 'user', or 'plugin').
+            field: Field name.
+            value: Field value.
+
+        Returns:
+            Number of paths with matching field value.
+        """
+        field_index = self._secondary_indexes.get(section, {}).get(field)
+        if not field_index:
+            return 0
+
+        return len(field_index.get(value, ()))
+
+    def has_index(self, section: str, field: str) -> bool:
+        """
+        Check whether a field has any indexed values.
+
+        Args:
+            section: Metadata section ('system', 'user', or 'plugin').
+            field: Field name.
+
+        Returns:
+            Whether the field is present in the secondary indexes.
+        """
+        section_index = self._secondary_indexes.get(section)
+        return section_index is not None and field in section_index
+
+    def paths_with_field(self, section: str, field: str) -> Set[str]:
+        """
+        Find all paths that have a field, whatever its value.
+
+        Args:
+            section: Metadata section ('system', 'user', or 'plugin').
+            field: Field name.
+
+        Returns:
+            Set of paths that have the field.
+        """
+        if section not in self._secondary_indexes:
+            return set()
+
+        return set(self._field_values[section].get(field, ()))
+
+    def field_values(self, section: str, field: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a copy of the mapping of paths to their value for a field.
+
+        The mapping lets a scan read one field of many paths with a single
+        lookup per path. It is a copy, so a scan is not affected by writes
+        made while it runs.
+
+        Args:
+            section: Metadata section.
+            field: Field name.
+
+        Returns:
+            Mapping of paths that have the field to its value, or None if
+            the section is not tracked by the registry.
+        """
+        section_values = self._field_values.get(section)
+        if section_values is None:
+            return None
+
+        return dict(section_values.get(field, ()))
+
+    def find_by_range(
+        self,
+        section: str,
+        field: str,
+        lower: Optional[float] = None,
+        upper: Optional[float] = None,
+        include_lower: bool = True,
+        include_upper: bool = True,
+    ) -> Set[str]:
+        """
+        Find paths whose numeric field value lies within a range.
+
+        Args:
+            section: Metadata section ('system', 'user', or 'plugin').
+            field: Field name.
+            lower: Lower bound, or None for no lower bound.
+            upper: Upper bound, or None for no upper bound.
+            include_lower: Whether the lower bound itself matches.
+            include_upper: Whether the upper bound itself matches.
+
+        Returns:
+            Set of paths with a numeric field value in the range.
+        """
+        field_index = self._secondary_indexes.get(section, {}).get(field)
+        if not field_index:
+            return set()
+
+        with self._sorted_lock:
+            values = self._sorted_field_values(section, field, "number")
+
+            start = 0
+            if lower is not None:
+                if include_lower:
+                    start = bisect.bisect_left(values, lower)
+                else:
+                    start = bisect.bisect_right(values, lower)
+
+            end = len(values)
+            if upper is not None:
+                if include_upper:
+                    end = bisect.bisect_right(values, upper)
+                else:
+                    end = bisect.bisect_left(values, upper)
+
+            matches = values[start:end]
+
+        result = set()
+        for value in matches:
+            result.update(field_index.get(value, ()))
+
+        return result
+
+    def find_by_prefix(self, section: str, field: str, prefix: str) -> Set[str]:
+        """
+        Find paths whose string field value starts with a prefix.
+
+        Args:
+            section: Metadata section ('system', 'user', or 'plugin').
+            field: Field name.
+            prefix: Prefix to match.
+
+        Returns:
+            Set of paths with a matching field value.
+        """
+        field_index = self._secondary_indexes.get(section, {}).get(field)
+        if not field_index:
+            return set()
+
+        with self._sorted_lock:
+            values = self._sorted_field_values(section, field, "prefix")
+            matches = self._prefix_range(values, prefix)
+
+        result = set()
+        for value in matches:
+            result.update(field_index.get(value, ()))
+
+        return result
+
+    def find_by_suffix(self, section: str, field: str, suffix: str) -> Set[str]:
+        """
+        Find paths whose string field value ends with a suffix.
+
+        Args:
+            section: Metadata section ('system', 'user', or 'plugin').
+            field: Field name.
+            suffix: Suffix to match.
+
+        Returns:
+            Set of paths with a matching field value.
+        """
+        field_index = self._secondary_indexes.get(section, {}).get(field)
+        if not field_index:
+            return set()
+
+        # Reversed strings, so a suffix becomes a prefix
+        with self._sorted_lock:
+            values = self._sorted_field_values(section, field, "suffix")
+            matches = self._prefix_range(values, suffix[::-1])
+
+        result = set()
+        for value in matches:
+            result.update(field_index.get(value[::-1], ()))
+
+        return result
+
+    def _prefix_range(self, values: List[str], prefix: str) -> List[str]:
+        """
+        Get the strings in a sorted list that start with a prefix.
+
+        Args:
+            values: Sorted list of strings.
+            prefix: Prefix to match.
+
+        Returns:
+            Matching strings, in sorted order.
+        """
+        # Strings sharing a prefix are contiguous in sorted order
+        start = end = bisect.bisect_left(values, prefix)
+        while end < len(values) and values[end].startswith(prefix):
+            end += 1
+        return values[start:end]
+
+    def _sorted_field_values(self, section: str, field: str, kind: str) -> List[Any]:
+        """
+        Get the sorted values of a field index, building them if needed.
+        Requires the sorted values lock.
+
+        Args:
+            section: Metadata section.
+            field: Field name.
+            kind: 'number' for numeric values, 'prefix' for strings, or
+                'suffix' for reversed strings.
+
+        Returns:
+            Sorted list of index values.
+        """
+        by_kind = self._sorted_values.setdefault((section, field), {})
+        values = by_kind.get(kind)
+        if values is None:
+            field_index = self._secondary_indexes.get(section, {}).get(field, {})
+            keys = (self._sort_key(kind, value) for value in tuple(field_index))
+            values = by_kind[kind] = sorted(key for key in keys if key is not None)
+
+        return values
+
+    def _update_sorted_values(self, section: str, field: str, value: Any, insert: bool) -> None:
+        """
+        Insert a value into, or remove it from, the built sorted value lists.
+
+        Args:
+            section: Metadata section.
+            field: Field name.
+            value: Value added to or removed from the field index.
+            insert: Whether the value was added rather than removed.
+        """
+        # Most fields never serve a range or prefix query. A list built
+        # concurrently is created before it reads the field index, so it
+        # either exists by now or will see this change.
+        if (section, field) not in self._sorted_values:
+            return
+
+        with self._sorted_lock:
+            by_kind = self._sorted_values.get((section, field))
+            if not by_kind:
+                return
+
+            for kind, values in by_kind.items():
+                key = self._sort_key(kind, value)
+                if key is None:
+                    continue
+
+                # A list built after the index changed may already be up to date
+                i = bisect.bisect_left(values, key)
+                present = i < len(values) and values[i] == key
+                if insert and not present:
+                    values.insert(i, key)
+                elif not insert and present:
+                    del values[i]
+
+    def _sort_key(self, kind: str, value: Any) -> Any:
+        """
+        Get the key a value is sorted by in a sorted value list.
+
+        Args:
+            kind: Kind of sorted list.
+            value: Index value.
+
+        Returns:
+            Sort key, or None if the value does not belong in the list.
+        """
+        if kind == "number":
+            if isinstance(value, (int, float)) and not math.isnan(value):
+                return value
+        elif isinstance(value, str):
+            return value if kind == "prefix" else value[::-1]
+        return None
+
+    def _set_primary(self, path: str, metadata: Dict[str, Any]) -> None:
+        """
+        Store an entry in the primary index.
+
+        Args:
+            path: Path to the file.
+            metadata: Metadata to store.
+        """
+        if immutables is not None:
+            # Publish a new map; readers holding the old one are unaffected
+            self._primary_index = self._primary_index.set(path, metadata)
+        else:
+            self._primary_index[path] = metadata
+
     def _index_metadata(self, path: str, metadata: Dict[str, Any]) -> None:
         """
         Index metadata in secondary indexes.
@@ -122,29 +501,37 @@ class MetadataRegistry:
             path: Path to the file.
             metadata: Metadata to index.
         """
+        is_indexable = self._is_indexable
+
         for section, section_data in metadata.items():
-            if section not in self._secondary_indexes:
+            section_index = self._secondary_indexes.get(section)
+            if section_index is None:
                 continue
 
-            section_index = self._secondary_indexes[section]
+            section_values = self._field_values[section]
 
+            # One lookup per level, creating missing levels on the miss path
             for field, value in section_data.items():
+                values = section_values.get(field)
+                if values is None:
+                    values = section_values[field] = {}
+                values[path] = value
+
                 # Skip non-indexable values
-                if not self._is_indexable(value):
+                if not is_indexable(value):
                     continue
 
-                # Create field index if it doesn't exist
-                if field not in section_index:
-                    section_index[field] = {}
+                field_index = section_index.get(field)
+                if field_index is None:
+                    field_index = section_index[field] = {}
 
-                field_index = section_index[field]
-
-                # Create value index if it doesn't exist
-                if value not in field_index:
-                    field_index[value] = set()
+                bucket = field_index.get(value)
+                if bucket is None:
+                    bucket = field_index[value] = set()
+                    self._update_sorted_values(section, field, value, insert=True)
 
                 # Add path to value index
-                field_index[value].add(path)
+                bucket.add(path)
 
     def _remove_from_secondary_indexes(
         self, path: str, metadata: Dict[str, Any]
@@ -162,7 +549,15 @@ class MetadataRegistry:
 
             section_index = self._secondary_indexes[section]
 
+            section_values = self._field_values[section]
+
             for field, value in section_data.items():
+                values = section_values.get(field)
+                if values is not None:
+                    values.pop(path, None)
+                    if not values:
+                        del section_values[field]
+
                 # Skip non-indexable values
                 if not self._is_indexable(value):
                     continue
@@ -183,9 +578,12 @@ class MetadataRegistry:
                 # Clean up empty indexes
                 if not field_index[value]:
                     del field_index[value]
+                    self._update_sorted_values(section, field, value, insert=False)
 
                 if not field_index:
                     del section_index[field]
+                    with self._sorted_lock:
+                        self._sorted_values.pop((section, field), None)
 
     def _is_indexable(self, value: Any) -> bool:
         """
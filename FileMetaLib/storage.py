@@ -3,12 +3,17 @@
 Storage backends for FileMetaLib.
 """
 
+import logging
 import os
-import json
 import sqlite3
+import threading
 from typing import Dict, List, Any, Tuple, Iterator
 from abc import ABC, abstractmethod
 
+from .utils import json_dumps, json_loads
+
+logger = logging.getLogger(__name__)
+
 
 class StorageBackend(ABC):
     """
@@ -41,6 +46,36 @@ class StorageBackend(ABC):
         """
         pass
 
+    def save_batch(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """
+        Save metadata for many files.
+
+        Backends should override this when they can persist a batch more
+        cheaply than one save() per item.
+
+        Args:
+            items: List of (path, metadata) tuples.
+        """
+        for path, metadata in items:
+            self.save(path, metadata)
+
+    def save_patch(
+        self, path: str, section: str, value: Dict[str, Any], metadata: Dict[str, Any]
+    ) -> None:
+        """
+        Save a change to a single metadata section of a file.
+
+        Backends should override this when they can write one section without
+        rewriting the whole entry. The default saves the full metadata.
+
+        Args:
+            path: Path to the file.
+            section: Name of the changed section ('user', 'system' or 'plugin').
+            value: New contents of the section.
+            metadata: Full metadata including the change.
+        """
+        self.save(path, metadata)
+
     @abstractmethod
     def delete(self, path: str) -> None:
         """
@@ -61,6 +96,10 @@ class StorageBackend(ABC):
         """
         pass
 
+    def close(self) -> None:
+        """Release any resources held by the backend."""
+        pass
+
 
 class MemoryDB(StorageBackend):
     """
@@ -120,28 +159,43 @@ class JsonDB(StorageBackend):
     """
     JSON file storage backend.
 
-    This backend stores metadata in a JSON file.
+    This backend stores metadata in a JSON file. Changes are appended to a
+    log file next to it (file_path + '.wal') and folded into the JSON file
+    by flush(), which runs automatically every checkpoint_ops changes and on
+    close(). Opening the database replays any log left behind.
     """
 
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, checkpoint_ops: int = 1000):
         """
         Initialize a new JsonDB.
 
         Args:
             file_path: Path to the JSON file.
+            checkpoint_ops: Number of logged changes after which the JSON
+                file is rewritten and the log cleared.
         """
         self.file_path = file_path
+        self.wal_path = file_path + ".wal"
+        self.checkpoint_ops = checkpoint_ops
         self._data = {}
+        self._lock = threading.Lock()
 
         # Load existing data if file exists
         if os.path.exists(file_path):
             try:
-                with open(file_path, "r") as f:
-                    self._data = json.load(f)
-            except json.JSONDecodeError:
+                with open(file_path, "rb") as f:
+                    self._data = json_loads(f.read())
+            except ValueError:
                 # File exists but is not valid JSON
                 self._data = {}
 
+        # Apply changes logged since the last flush, then fold them into the
+        # JSON file so new changes never follow a partially written line
+        self._pending_ops = self._replay_wal()
+        self._wal = open(self.wal_path, "ab")
+        if self._wal.tell():
+            self._checkpoint(force=True)
+
     def save(self, path: str, metadata: Dict[str, Any]) -> None:
         """
         Save metadata for a file.
@@ -150,8 +204,16 @@ class JsonDB(StorageBackend):
             path: Path to the file.
             metadata: Metadata to save.
         """
-        self._data[path] = metadata
-        self._write_to_disk()
+        self._log([(path, metadata)])
+
+    def save_batch(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """
+        Save metadata for many files with a single write to the log.
+
+        Args:
+            items: List of (path, metadata) tuples.
+        """
+        self._log(items)
 
     def load(self, path: str) -> Dict[str, Any]:
         """
@@ -173,8 +235,7 @@ class JsonDB(StorageBackend):
             path: Path to the file.
         """
         if path in self._data:
-            del self._data[path]
-            self._write_to_disk()
+            self._log([(path, None)])
 
     def load_all(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
         """
@@ -186,19 +247,132 @@ class JsonDB(StorageBackend):
         for path, metadata in self._data.items():
             yield path, metadata
 
+    def flush(self) -> None:
+        """Rewrite the JSON file with all changes and clear the log."""
+        with self._lock:
+            self._checkpoint()
+
+    def close(self) -> None:
+        """Flush all changes and close the log."""
+        with self._lock:
+            if self._wal.closed:
+                return
+            self._checkpoint()
+            self._wal.close()
+
+    def __enter__(self):
+        """Enter context manager."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Exit context manager, flushing all changes."""
+        self.close()
+
+    def _log(self, items: List[Tuple[str, Any]]) -> None:
+        """
+        Apply changes in memory and append them to the log.
+
+        Args:
+            items: List of (path, metadata) tuples; None metadata deletes.
+        """
+        lines = []
+        for path, metadata in items:
+            if metadata is None:
+                lines.append(json_dumps({"op": "del", "path": path}))
+            else:
+                lines.append(json_dumps({"op": "put", "path": path, "meta": metadata}))
+        lines.append(b"")
+
+        with self._lock:
+            for path, metadata in items:
+                if metadata is None:
+                    self._data.pop(path, None)
+                else:
+                    self._data[path] = metadata
+
+            self._wal.write(b"\n".join(lines))
+            self._wal.flush()
+
+            self._pending_ops += len(items)
+            if self._pending_ops >= self.checkpoint_ops:
+                self._checkpoint()
+
+    def _replay_wal(self) -> int:
+        """
+        Apply changes from a log left by a previous session.
+
+        Returns:
+            Number of changes applied.
+        """
+        if not os.path.exists(self.wal_path):
+            return 0
+
+        with open(self.wal_path, "rb") as f:
+            lines = f.read().split(b"\n")
+
+        count = 0
+        last = len(lines) - 1
+        for number, line in enumerate(lines):
+            if not line:
+                continue
+
+            try:
+                entry = json_loads(line)
+            except ValueError:
+                # A partially written last line is expected after a crash
+                if number != last:
+                    logger.warning(
+                        "Skipping unreadable line %d of %s", number + 1, self.wal_path
+                    )
+                continue
+
+            if entry["op"] == "put":
+                self._data[entry["path"]] = entry["meta"]
+            else:
+                self._data.pop(entry["path"], None)
+            count += 1
+
+        return count
+
+    def _checkpoint(self, force: bool = False) -> None:
+        """
+        Write the JSON file atomically and clear the log. Requires the lock.
+
+        Args:
+            force: Whether to write even if no changes are pending.
+        """
+        if not force and self._pending_ops == 0 and os.path.exists(self.file_path):
+            return
+
+        self._write_to_disk()
+        self._wal.seek(0)
+        self._wal.truncate()
+        self._pending_ops = 0
+
     def _write_to_disk(self) -> None:
-        """Write data to disk."""
-        with open(self.file_path, "w") as f:
-            json.dump(self._data, f, indent=2)
+        """Write data to disk as compact JSON."""
+        data = json_dumps(self._data)
+        tmp_path = self.file_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            # The log is cleared right after the replace, so the new file
+            # must be on disk first
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.file_path)
 
 
 class SQLiteDB(StorageBackend):
     """
     SQLite storage backend.
 
-    This backend stores metadata in a SQLite database.
+    This backend stores metadata in a SQLite database. A single connection
+    in WAL mode is shared by all operations and serialized with a lock.
     """
 
+    # Number of rows fetched at a time by load_all
+    _FETCH_SIZE = 1000
+
     def __init__(self, db_path: str):
         """
         Initialize a new SQLiteDB.
@@ -207,23 +381,24 @@ class SQLiteDB(StorageBackend):
             db_path: Path to the SQLite database.
         """
         self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
         self._init_db()
 
     def _init_db(self) -> None:
         """Initialize the database."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        # Create table if it doesn't exist
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS metadata (
-            path TEXT PRIMARY KEY,
-            data TEXT NOT NULL
-        )
-        """)
-
-        conn.commit()
-        conn.close()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+
+            with self._conn:
+                # Create table if it doesn't exist
+                self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS metadata (
+                    path TEXT PRIMARY KEY,
+                    data TEXT NOT NULL
+                )
+                """)
 
     def save(self, path: str, metadata: Dict[str, Any]) -> None:
         """
@@ -233,20 +408,66 @@ class SQLiteDB(StorageBackend):
             path: Path to the file.
             metadata: Metadata to save.
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
         # Convert metadata to JSON
-        data_json = json.dumps(metadata)
+        data_json = json_dumps(metadata).decode("utf-8")
 
-        # Insert or replace
-        cursor.execute(
-            "INSERT OR REPLACE INTO metadata (path, data) VALUES (?, ?)",
-            (path, data_json),
-        )
+        with self._lock, self._conn:
+            # Insert or replace
+            self._conn.execute(
+                "INSERT OR REPLACE INTO metadata (path, data) VALUES (?, ?)",
+                (path, data_json),
+            )
 
-        conn.commit()
-        conn.close()
+    def save_batch(self, items: List[Tuple[str, Dict[str, Any]]]) -> None:
+        """
+        Save metadata for many files in a single transaction.
+
+        Args:
+            items: List of (path, metadata) tuples.
+        """
+        rows = [(path, json_dumps(metadata).decode("utf-8")) for path, metadata in items]
+
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO metadata (path, data) VALUES (?, ?)", rows
+            )
+
+    def save_patch(
+        self, path: str, section: str, value: Dict[str, Any], metadata: Dict[str, Any]
+    ) -> None:
+        """
+        Save a change to a single metadata section of a file.
+
+        Only the changed section is serialized; SQLite splices it into the
+        stored document. Falls back to a full save if the row does not exist,
+        either document holds NaN or Infinity, or the JSON1 functions are
+        unavailable.
+
+        Args:
+            path: Path to the file.
+            section: Name of the changed section ('user', 'system' or 'plugin').
+            value: New contents of the section.
+            metadata: Full metadata including the change.
+        """
+        value_json = json_dumps(value).decode("utf-8")
+
+        try:
+            with self._lock, self._conn:
+                # Documents holding NaN or Infinity are not strict JSON; newer
+                # SQLite versions would read them as JSON5 and rewrite those
+                # values, so they are saved in full instead
+                cursor = self._conn.execute(
+                    "UPDATE metadata SET data = json_set(data, ?, json(?)) "
+                    "WHERE path = ? AND json_valid(data) AND json_valid(?)",
+                    ("$." + section, value_json, path, value_json),
+                )
+                patched = cursor.rowcount == 1
+        except sqlite3.OperationalError:
+            # SQLite built without JSON1
+            patched = False
+
+        if not patched:
+            self.save(path, metadata)
 
     def load(self, path: str) -> Dict[str, Any]:
         """
@@ -258,16 +479,13 @@ class SQLiteDB(StorageBackend):
         Returns:
             Metadata for the file, or None if not found.
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT data FROM metadata WHERE path = ?", (path,))
-        row = cursor.fetchone()
-
-        conn.close()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM metadata WHERE path = ?", (path,)
+            ).fetchone()
 
         if row:
-            return json.loads(row[0])
+            return json_loads(row[0])
         return None
 
     def delete(self, path: str) -> None:
@@ -277,27 +495,34 @@ class SQLiteDB(StorageBackend):
         Args:
             path: Path to the file.
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute("DELETE FROM metadata WHERE path = ?", (path,))
-
-        conn.commit()
-        conn.close()
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM metadata WHERE path = ?", (path,))
 
     def load_all(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
         """
         Load all metadata.
 
+        Rows are streamed in chunks rather than fetched all at once.
+
         Returns:
             Iterator of (path, metadata) tuples.
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT path, data FROM metadata")
-
-        for path, data_json in cursor.fetchall():
-            yield path, json.loads(data_json)
-
-        conn.close()
+        with self._lock:
+            cursor = self._conn.execute("SELECT path, data FROM metadata")
+
+        try:
+            while True:
+                with self._lock:
+                    rows = cursor.fetchmany(self._FETCH_SIZE)
+                if not rows:
+                    break
+
+                for path, data_json in rows:
+                    yield path, json_loads(data_json)
+        finally:
+            cursor.close()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
@@ -1,15 +1,49 @@
 # utils.py
 """
 Utility functions for FileMetaLib.
+
+These helpers spend their time on string handling and stat calls, which
+JIT compilers such as Numba cannot speed up, so they are kept as plain
+Python backed by caches and fewer system calls.
 """
 
-import os
-import time
-from typing import Dict, Any
-from datetime import datetime
-from typing import Dict, Any
+import json
+import math
+import operator
 import os
 import platform
+import re
+import time
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Any, Iterable, List, Optional, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Minimum number of paths sharing a directory before find_missing lists it
+_SCANDIR_MIN_PATHS = 4
+
+# Platform check used for file creation times, which does not change at runtime
+_IS_WINDOWS = platform.system() == "Windows"
+
+# Reads a file's creation time from a stat result. Platforms without
+# st_birthtime fall back to st_ctime on Windows and st_mtime elsewhere.
+if hasattr(os.stat_result, "st_birthtime"):
+    _created_time = operator.attrgetter("st_birthtime")
+elif _IS_WINDOWS:
+    _created_time = operator.attrgetter("st_ctime")
+else:
+    _created_time = operator.attrgetter("st_mtime")
+
+# Units used by format_size, in steps of 1024
+_SIZE_UNITS = ("B", "KB", "MB", "GB", "TB")
+
+# Runs of digits that may be an integer orjson would read back as a float
+_LONG_DIGITS = re.compile(rb"\d{19}")
+
 
 def normalize_path(path: str) -> str:
     """
@@ -21,28 +55,138 @@ def normalize_path(path: str) -> str:
     Returns:
         Normalized path.
     """
-    # Convert to absolute path
-    if not os.path.isabs(path):
-        path = os.path.abspath(path)
+    if os.path.isabs(path):
+        return _normalize_absolute_path(path)
+
+    if os.name == "posix":
+        # Same as posixpath.abspath, with the normalization memoized. The
+        # working directory is read on every call, since it may change.
+        return _normalize_absolute_path(os.path.join(os.getcwd(), path))
+
+    # abspath also normalizes separators
+    return os.path.abspath(path)
+
+
+@lru_cache(maxsize=16384)
+def _normalize_absolute_path(path: str) -> str:
+    """
+    Normalize an absolute file path.
+
+    Args:
+        path: Absolute path to normalize.
+
+    Returns:
+        Normalized path.
+    """
+    return os.path.normpath(path)
+
 
-    # Normalize separators
-    path = os.path.normpath(path)
+def json_dumps(obj: Any) -> bytes:
+    """
+    Serialize an object to JSON, using orjson when it is installed.
 
-    return path
+    Documents orjson cannot write losslessly are written by the json module,
+    and json_loads reads them back the same way.
 
+    Args:
+        obj: Object to serialize.
 
+    Returns:
+        UTF-8 encoded JSON.
+    """
+    if orjson is not None:
+        try:
+            # Non-string keys are converted to strings, as the json module does
+            data = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            # Values orjson rejects, such as integers beyond 64 bits
+            pass
+        else:
+            # orjson writes NaN and Infinity as null
+            if b"null" not in data:
+                return data
+
+    return json.dumps(obj).encode("utf-8")
+
+
+def json_loads(data: Union[bytes, str]) -> Any:
+    """
+    Deserialize JSON, using orjson when it is installed.
+
+    Args:
+        data: JSON document.
+
+    Returns:
+        Deserialized object.
+
+    Raises:
+        ValueError: If the document is not valid JSON.
+    """
+    if orjson is not None:
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+
+        # orjson reads integers beyond 64 bits as floats
+        if not _LONG_DIGITS.search(data):
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                # orjson rejects the NaN and Infinity literals the json module
+                # writes, so let the json module decide
+                pass
+
+    return json.loads(data)
 
 
 def format_time(epoch_time: float) -> str:
     """Convert epoch time to human-readable format."""
-    return datetime.fromtimestamp(epoch_time).strftime("%Y-%m-%d %H:%M:%S")
+    # Only whole seconds are shown, so files modified within the same second
+    # share a cached result. Round to microseconds first, as fromtimestamp does.
+    seconds = math.floor(epoch_time)
+    if round((epoch_time - seconds) * 1e6) >= 1000000:
+        seconds += 1
+    return _format_seconds(seconds)
 
-def get_system_metadata(path: str) -> Dict[str, Any]:
+
+@lru_cache(maxsize=8192)
+def _format_seconds(seconds: int) -> str:
+    """
+    Convert whole epoch seconds to human-readable format.
+
+    Args:
+        seconds: Epoch time in whole seconds.
+
+    Returns:
+        Formatted local time.
+    """
+    return _format_struct_time(time.localtime(seconds))
+
+
+def _format_struct_time(tm: time.struct_time) -> str:
+    """
+    Format a struct_time as "%Y-%m-%d %H:%M:%S" without going through strftime.
+
+    Args:
+        tm: Local time to format.
+
+    Returns:
+        Formatted time.
+    """
+    return (
+        f"{tm.tm_year:04d}-{tm.tm_mon:02d}-{tm.tm_mday:02d} "
+        f"{tm.tm_hour:02d}:{tm.tm_min:02d}:{tm.tm_sec:02d}"
+    )
+
+
+def get_system_metadata(
+    path: str, stat: Optional[os.stat_result] = None
+) -> Dict[str, Any]:
     """
     Get system metadata for a file.
 
     Args:
         path: Path to the file.
+        stat: Result of os.stat(path), if the caller already has it.
 
     Returns:
         System metadata.
@@ -50,21 +194,26 @@ def get_system_metadata(path: str) -> Dict[str, Any]:
     Raises:
         FileNotFoundError: If the file does not exist.
     """
-    if not os.path.exists(path):
-        raise FileNotFoundError(f"File not found: {path}")
+    if stat is None:
+        # A single stat; like os.path.exists, any failure means not found
+        try:
+            stat = os.stat(path)
+        except OSError:
+            raise FileNotFoundError(f"File not found: {path}")
+
+    created_time = _created_time(stat)
 
-    stat = os.stat(path)
+    filename = os.path.basename(path)
 
-    # Handle platforms that may not have st_birthtime
-    if hasattr(stat, "st_birthtime"):
-        created_time = stat.st_birthtime
-    else:
-        created_time = stat.st_ctime if platform.system() == "Windows" else stat.st_mtime
+    # Same as os.path.splitext(filename)[1][1:]: leading dots do not start
+    # an extension
+    stem = filename.lstrip(".")
+    extension = stem[stem.rfind(".") + 1:].lower() if "." in stem else ""
 
     return {
         "path": path,
-        "filename": os.path.basename(path),
-        "extension": os.path.splitext(path)[1].lower()[1:],
+        "filename": filename,
+        "extension": extension,
         "size": stat.st_size,
         "created": format_time(created_time),
         "modified": format_time(stat.st_mtime),
@@ -72,6 +221,85 @@ def get_system_metadata(path: str) -> Dict[str, Any]:
     }
 
 
+def stat_many(paths: Iterable[str]) -> Dict[str, Optional[os.stat_result]]:
+    """
+    Stat many files.
+
+    Each path gets a single os.stat(). Listing shared parent directories
+    first would not save any calls: DirEntry.stat() still makes one per
+    entry on POSIX, so the listing only adds work.
+
+    Args:
+        paths: Normalized paths to stat.
+
+    Returns:
+        Dictionary mapping each path to its stat result, or None if it does
+        not exist or cannot be accessed.
+    """
+    results = {}
+
+    for path in paths:
+        try:
+            results[path] = os.stat(path)
+        except OSError:
+            results[path] = None
+
+    return results
+
+
+def find_missing(paths: Iterable[str]) -> List[str]:
+    """
+    Find paths that no longer exist, listing shared parent directories once.
+
+    Paths whose directory holds several of them are checked by name against a
+    single os.scandir() listing; symlinks in the listing are still resolved so
+    broken links count as missing, like os.path.exists. Other paths, and paths
+    whose name is not in the listing, are checked with os.path.exists.
+
+    Args:
+        paths: Normalized paths to check.
+
+    Returns:
+        Paths that do not exist.
+    """
+    by_dir = defaultdict(list)
+    for path in paths:
+        by_dir[os.path.dirname(path)].append(path)
+
+    missing = []
+
+    for directory, dir_paths in by_dir.items():
+        entries = None
+        if len(dir_paths) >= _SCANDIR_MIN_PATHS:
+            try:
+                with os.scandir(directory) as it:
+                    entries = {entry.name: entry for entry in it}
+            except FileNotFoundError:
+                missing.extend(dir_paths)
+                continue
+            except OSError:
+                # Unreadable directory; fall back to checking each path
+                entries = None
+
+        for path in dir_paths:
+            if entries is None:
+                exists = os.path.exists(path)
+            else:
+                entry = entries.get(os.path.basename(path))
+                if entry is None:
+                    # The listing spells names exactly; ask the OS in case
+                    # it matches names case- or normalization-insensitively
+                    exists = os.path.exists(path)
+                elif entry.is_symlink():
+                    exists = os.path.exists(path)
+                else:
+                    exists = True
+
+            if not exists:
+                missing.append(path)
+
+    return missing
+
 
 def format_timestamp(timestamp: float) -> str:
     """
@@ -83,7 +311,7 @@ def format_timestamp(timestamp: float) -> str:
     Returns:
         Formatted timestamp.
     """
-    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp))
+    return _format_struct_time(time.localtime(timestamp))
 
 
 def format_size(size: int) -> str:
@@ -96,7 +324,9 @@ def format_size(size: int) -> str:
     Returns:
         Formatted size.
     """
-    for unit in ["B", "KB", "MB", "GB", "TB"]:
-        if size < 1024 or unit == "TB":
-            return f"{size:.2f} {unit}"
-        size /= 1024
+    if size < 1024:
+        return f"{size:.2f} B"
+
+    # Each unit is 2**10 times the previous one
+    index = min((int(size).bit_length() - 1) // 10, len(_SIZE_UNITS) - 1)
+    return f"{size / (1 << (10 * index)):.2f} {_SIZE_UNITS[index]}"
@@ -0,0 +1,206 @@
+# write_buffer.py
+"""
+Write-back buffer for FileMetaLib storage backends.
+"""
+
+import logging
+import threading
+from typing import Any, Dict
+
+from .storage import StorageBackend
+
+logger = logging.getLogger(__name__)
+
+# Marker for a pending delete
+_DELETED = object()
+
+# Longest delay in seconds between background retries of a failed flush
+_MAX_BACKOFF = 5.0
+
+
+class WriteBuffer:
+    """
+    Deferred write buffer in front of a storage backend.
+
+    Saves and deletes are recorded in memory and written to the backend in
+    batches by a background thread, either every flush_interval seconds or as
+    soon as max_pending paths are waiting. Only the latest write per path is
+    kept, so repeated updates of the same file cost a single backend write.
+
+    Failed flushes are retried with exponential backoff. After max_retries
+    failures in a row the background thread stops retrying and keeps the
+    pending writes until flush() or close() is called, which retry and raise
+    the backend's error to the caller.
+    """
+
+    def __init__(
+        self,
+        storage: StorageBackend,
+        flush_interval: float = 0.01,
+        max_pending: int = 1024,
+        max_retries: int = 5,
+    ):
+        """
+        Initialize a new WriteBuffer.
+
+        Args:
+            storage: Storage backend to write to.
+            flush_interval: Maximum delay in seconds before pending writes are flushed.
+            max_pending: Number of pending paths that triggers an immediate flush.
+            max_retries: Number of consecutive failed flushes after which the
+                background thread waits for an explicit flush() or close().
+        """
+        self.storage = storage
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.pending: Dict[str, Any] = {}
+
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._has_pending = threading.Event()
+        self._full = threading.Event()
+        self._resume = threading.Event()
+        self._stopping = threading.Event()
+        self._running = True
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def enqueue(self, path: str, metadata: Dict[str, Any]) -> None:
+        """
+        Queue metadata to be saved.
+
+        Args:
+            path: Path to the file.
+            metadata: Metadata to save.
+        """
+        self._put(path, metadata)
+
+    def enqueue_delete(self, path: str) -> None:
+        """
+        Queue metadata to be deleted.
+
+        Args:
+            path: Path to the file.
+        """
+        self._put(path, _DELETED)
+
+    def flush(self) -> int:
+        """
+        Write all pending changes to the storage backend.
+
+        Returns:
+            Number of paths written or deleted.
+
+        Raises:
+            Exception: Whatever the storage backend raised. The changes stay
+                pending.
+        """
+        count = self._flush()
+
+        # Let the background thread resume if it gave up retrying
+        self._resume.set()
+        return count
+
+    def close(self) -> None:
+        """Stop the flush thread and write all pending changes."""
+        self._running = False
+        self._has_pending.set()
+        self._full.set()
+        self._resume.set()
+        self._stopping.set()
+        self._thread.join(timeout=1)
+        self.flush()
+
+    def _flush(self) -> int:
+        """
+        Write all pending changes to the storage backend.
+
+        Returns:
+            Number of paths written or deleted.
+        """
+        # Serialize flushes so an older batch never lands after a newer one
+        with self._flush_lock:
+            with self._lock:
+                batch = self.pending
+                self.pending = {}
+                self._has_pending.clear()
+                self._full.clear()
+
+            if not batch:
+                return 0
+
+            saves = [(path, meta) for path, meta in batch.items() if meta is not _DELETED]
+            deletes = [path for path, meta in batch.items() if meta is _DELETED]
+
+            try:
+                if saves:
+                    self.storage.save_batch(saves)
+                for path in deletes:
+                    self.storage.delete(path)
+            except Exception:
+                # Requeue the batch unless newer writes superseded it
+                with self._lock:
+                    for path, meta in batch.items():
+                        self.pending.setdefault(path, meta)
+                    self._has_pending.set()
+                raise
+
+            return len(batch)
+
+    def _put(self, path: str, value: Any) -> None:
+        """
+        Record a pending change and wake the flush thread if needed.
+
+        Args:
+            path: Path to the file.
+            value: Metadata to save, or _DELETED.
+        """
+        with self._lock:
+            self.pending[path] = value
+            self._has_pending.set()
+            if len(self.pending) >= self.max_pending:
+                self._full.set()
+
+    def _run(self) -> None:
+        """Flush loop run by the background thread."""
+        failures = 0
+
+        while self._running:
+            self._has_pending.wait()
+            if not self._running:
+                return
+
+            # Give more writes a chance to join the batch unless it is full
+            self._full.wait(self.flush_interval)
+
+            try:
+                self._flush()
+            except Exception:
+                failures += 1
+                if failures == 1:
+                    # Only a flush() during this run of failures may resume
+                    # the thread after it gives up
+                    self._resume.clear()
+
+                if failures < self.max_retries:
+                    logger.warning(
+                        "Failed to flush write buffer (attempt %d of %d)",
+                        failures,
+                        self.max_retries,
+                        exc_info=True,
+                    )
+                    delay = min(self.flush_interval * 2 ** failures, _MAX_BACKOFF)
+                    self._stopping.wait(delay)
+                    continue
+
+                logger.exception(
+                    "Failed to flush write buffer %d times; keeping changes "
+                    "pending until flush() or close()",
+                    failures,
+                )
+                self._resume.wait()
+                self._resume.clear()
+
+            failures = 0
@@ -1,6 +1,10 @@
 # setup.py
+from pathlib import Path
+
 from setuptools import setup, find_packages
 
+long_description = (Path(__file__).parent / "Readme.md").read_text(encoding="utf-8")
+
 setup(
     name="FileMetaLib",
     version="0.1.1",
@@ -10,12 +14,13 @@ setup(
     ],
     extras_require={
         "image": ["Pillow"],
-        "all": ["Pillow"],
+        "fast": ["orjson", "immutables>=0.20"],
+        "all": ["Pillow", "orjson", "immutables>=0.20"],
     },
     author="Srinivas Sarkar",
     author_email="srinivassarkar07@gmail.com",
     description="A library for attaching, indexing, and querying metadata for files",
-    long_description=open("README.md").read(),
+    long_description=long_description,
     long_description_content_type="text/markdown",
     url="https://github.com/srinivassarkar/FileMetaLib",
     classifiers=[
@@ -0,0 +1,67 @@
+import math
+import os
+import tempfile
+import unittest
+
+from FileMetaLib import FileAccessError, FileMetaManager
+
+
+class ExportImportTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "file.txt")
+        with open(self.path, "w") as f:
+            f.write("x")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_export_import_round_trips_nan(self):
+        source = FileMetaManager()
+        source.add_file(self.path, {"score": float("nan"), "limit": float("inf")})
+        export_path = os.path.join(self.tmp.name, "export.json")
+        self.assertEqual(source.export_metadata(export_path), 1)
+        source.close()
+
+        target = FileMetaManager()
+        self.assertEqual(target.import_metadata(export_path), 1)
+
+        user = target.get_metadata(self.path)["user"]
+        self.assertTrue(math.isnan(user["score"]))
+        self.assertEqual(user["limit"], float("inf"))
+        target.close()
+
+
+class SyncTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.manager = FileMetaManager()
+        self.paths = []
+        for n in range(6):
+            path = os.path.join(self.tmp.name, f"file{n}.txt")
+            with open(path, "w") as f:
+                f.write("x")
+            self.manager.add_file(path, {"n": n})
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.manager.close()
+        self.tmp.cleanup()
+
+    def test_sync_finds_removed_and_modified_files(self):
+        os.remove(self.paths[0])
+        with open(self.paths[1], "w") as f:
+            f.write("longer")
+        os.utime(self.paths[1], (0, 0))
+
+        self.assertEqual(self.manager.sync(), {"added": 0, "updated": 1, "removed": 1})
+        with self.assertRaises(FileAccessError):
+            self.manager.get_metadata(self.paths[0])
+        metadata = self.manager.get_metadata(self.paths[1])
+        self.assertEqual(metadata["system"]["size"], 6)
+        self.assertEqual(metadata["user"], {"n": 1})
+        self.assertEqual(self.manager.sync(), {"added": 0, "updated": 0, "removed": 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
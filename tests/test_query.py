@@ -0,0 +1,63 @@
+import unittest
+
+from FileMetaLib.query import QueryEngine
+from FileMetaLib.registry import MetadataRegistry
+
+
+class MixedTypeTest(unittest.TestCase):
+    def setUp(self):
+        self.registry = MetadataRegistry()
+        self.registry.add("/a", {"user": {"x": "abc", "y": ["a", "b"], "n": 1}})
+        self.registry.add("/b", {"user": {"x": 5, "y": ["b"], "n": "1"}})
+        self.registry.add("/c", {"user": {"x": ["a", 1], "y": "b", "n": {"k": 1}}})
+        self.engine = QueryEngine(self.registry)
+
+    def search(self, query):
+        return self.engine.execute(query)
+
+    def test_mismatched_operands_never_match(self):
+        self.assertEqual(self.search({"x": {"$contains": 0}}), set())
+        self.assertEqual(self.search({"x": {"$contains": ["a"]}}), set())
+        self.assertEqual(self.search({"n": {"$contains": []}}), set())
+        self.assertEqual(self.search({"x": {"$startswith": 1}}), set())
+        self.assertEqual(self.search({"x": {"$endswith": None}}), set())
+        self.assertEqual(self.search({"x": {"$regex": 1}}), set())
+        self.assertEqual(self.search({"x": {"$regex": ["a"]}}), set())
+        self.assertEqual(self.search({"x": {"$in": 5}}), set())
+        self.assertEqual(self.search({"x": {"$nin": 5}}), {"/a", "/b", "/c"})
+
+    def test_matching_values_of_other_types_are_skipped(self):
+        self.assertEqual(self.search({"x": {"$contains": "a"}}), {"/a", "/c"})
+        self.assertEqual(self.search({"x": {"$startswith": "ab"}}), {"/a"})
+        self.assertEqual(self.search({"x": {"$endswith": ("c", "z")}}), {"/a"})
+        self.assertEqual(self.search({"x": {"$regex": "^a"}}), {"/a"})
+
+    def test_result_does_not_depend_on_condition_order(self):
+        queries = [
+            {"y": ["a", "b"], "$not": {"x": {"$contains": 0}}},
+            {"x": {"$regex": "a."}, "n": {"$ne": "a", "$endswith": 1}},
+            {"n": 7, "$or": [{"x": {"$contains": 0}}, {"y": {"$startswith": 2}}]},
+        ]
+        expected = [{"/a"}, set(), set()]
+
+        for query, paths in zip(queries, expected):
+            self.assertEqual(self.search(query), paths)
+            self.assertEqual(self.search(dict(reversed(list(query.items())))), paths)
+
+
+class NanOperandTest(unittest.TestCase):
+    def test_explicit_equality_with_nan(self):
+        nan = float("nan")
+        registry = MetadataRegistry()
+        registry.add("/a", {"user": {"x": nan}})
+        registry.add("/b", {"user": {"x": 5}})
+        registry.add("/c", {"user": {}})
+        engine = QueryEngine(registry)
+
+        self.assertEqual(engine.execute({"x": {"$eq": nan}}), set())
+        self.assertEqual(engine.execute({"x": {"$ne": nan}}), {"/a", "/b"})
+        self.assertEqual(engine.execute({"$or": [{"x": {"$eq": nan}}, {"x": {"$eq": 5}}]}), {"/b"})
+
+
+if __name__ == "__main__":
+    unittest.main()
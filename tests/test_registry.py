@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+from FileMetaLib import FileMetaManager
+from FileMetaLib.registry import MetadataRegistry
+
+
+class RegistryOverwriteTest(unittest.TestCase):
+    def test_add_replaces_indexes_of_previous_entry(self):
+        registry = MetadataRegistry()
+        registry.add("/a", {"user": {"tags": ["a"], "note": "hello"}})
+        registry.add("/a", {"user": {"tags": ["b"]}})
+
+        self.assertEqual(registry.find_by_field("user", "note", "hello"), set())
+        self.assertEqual(registry.paths_with_field("user", "note"), set())
+        self.assertEqual(registry.field_values("user", "tags"), {"/a": ["b"]})
+
+    def test_add_file_overwrite_is_searchable(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "file.txt")
+            with open(path, "w") as f:
+                f.write("x")
+
+            manager = FileMetaManager()
+            manager.add_file(path, {"tags": ["a"], "note": "hello"})
+            manager.add_file(path, {"tags": ["b"]})
+
+            self.assertEqual(list(manager.search({"note": {"$exists": True}})), [])
+            self.assertEqual(list(manager.search({"note": {"$regex": "hel"}})), [])
+            self.assertEqual(list(manager.search({"note": "hello"})), [])
+            manager.close()
+
+
+class SortedValuesTest(unittest.TestCase):
+    def test_range_and_prefix_queries_follow_changes(self):
+        registry = MetadataRegistry()
+        for i in range(10):
+            registry.add(f"/{i}", {"system": {"size": i, "name": f"file{i}.txt"}})
+
+        # Build the sorted lists, then change the index under them
+        self.assertEqual(len(registry.find_by_range("system", "size", lower=5)), 5)
+        self.assertEqual(registry.find_by_prefix("system", "name", "file1"), {"/1"})
+        self.assertEqual(registry.find_by_suffix("system", "name", "9.txt"), {"/9"})
+
+        registry.add("/10", {"system": {"size": 7.5, "name": "file10.txt"}})
+        registry.remove("/7")
+        registry.update("/9", {"system": {"size": 90, "name": "other.txt"}})
+
+        self.assertEqual(
+            registry.find_by_range("system", "size", lower=5, upper=8),
+            {"/5", "/6", "/8", "/10"},
+        )
+        self.assertEqual(registry.find_by_range("system", "size", lower=50), {"/9"})
+        self.assertEqual(registry.find_by_prefix("system", "name", "file1"), {"/1", "/10"})
+        self.assertEqual(registry.find_by_suffix("system", "name", "9.txt"), set())
+        self.assertEqual(registry.find_by_prefix("system", "name", "other"), {"/9"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,192 @@
+import math
+import os
+import tempfile
+import threading
+import unittest
+
+from FileMetaLib.storage import JsonDB, SQLiteDB
+
+
+# Written separately, since either value alone takes a different path
+NAN_METADATA = {"user": {"score": float("nan"), "limit": float("inf"), "missing": None}}
+BIG_INT_METADATA = {"user": {"big": 2 ** 70, "small": -(2 ** 63) - 1}}
+
+
+class RoundTripTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def save(self, db):
+        db.save("/nan", NAN_METADATA)
+        db.save("/big", BIG_INT_METADATA)
+
+    def assertRoundTrips(self, load):
+        user = load("/nan")["user"]
+        self.assertTrue(math.isnan(user["score"]))
+        self.assertEqual(user["limit"], float("inf"))
+        self.assertIsNone(user["missing"])
+
+        user = load("/big")["user"]
+        self.assertEqual(user["big"], 2 ** 70)
+        self.assertIsInstance(user["big"], int)
+        self.assertEqual(user["small"], -(2 ** 63) - 1)
+
+    def test_json_db_round_trip(self):
+        path = os.path.join(self.tmp.name, "db.json")
+        db = JsonDB(path)
+        self.save(db)
+        db.close()
+
+        db = JsonDB(path)
+        self.assertRoundTrips(db.load)
+        db.close()
+
+    def test_json_db_wal_round_trip(self):
+        path = os.path.join(self.tmp.name, "db.json")
+        db = JsonDB(path)
+        self.save(db)
+        # Leave the changes in the log only, as after a crash
+        db._wal.close()
+
+        db = JsonDB(path)
+        self.assertRoundTrips(db.load)
+        db.close()
+
+    def test_sqlite_db_round_trip(self):
+        path = os.path.join(self.tmp.name, "db.sqlite")
+        db = SQLiteDB(path)
+        self.save(db)
+        db.close()
+
+        db = SQLiteDB(path)
+        self.assertRoundTrips(db.load)
+        self.assertRoundTrips(dict(db.load_all()).get)
+        db.close()
+
+
+class SQLitePatchTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = SQLiteDB(os.path.join(self.tmp.name, "db.sqlite"))
+        self.metadata = {
+            "user": {"tag": "a", "big": 2 ** 70},
+            "system": {"size": 1},
+            "plugin": {"text": {"lines": 2}},
+        }
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    def patch(self, path, section, value):
+        metadata = dict(self.metadata, **{section: value})
+        self.db.save_patch(path, section, value, metadata)
+        return metadata
+
+    def test_patch_keeps_other_sections(self):
+        self.db.save("/a", self.metadata)
+        self.db.save("/b", self.metadata)
+
+        expected = self.patch("/a", "user", {"tag": "b", "n": 2 ** 64})
+
+        self.assertEqual(self.db.load("/a"), expected)
+        self.assertEqual(self.db.load("/b"), self.metadata)
+
+    def test_patch_of_missing_row_saves_everything(self):
+        expected = self.patch("/a", "user", {"tag": "b"})
+        self.assertEqual(self.db.load("/a"), expected)
+
+    def test_patch_with_nan_saves_everything(self):
+        self.db.save("/a", self.metadata)
+        self.patch("/a", "user", {"score": float("nan")})
+        self.assertTrue(math.isnan(self.db.load("/a")["user"]["score"]))
+
+        # The stored document now holds NaN, so patching another section
+        # must not drop it either
+        self.metadata["user"] = {"score": float("nan")}
+        self.patch("/a", "system", {"size": 3})
+        metadata = self.db.load("/a")
+        self.assertTrue(math.isnan(metadata["user"]["score"]))
+        self.assertEqual(metadata["system"], {"size": 3})
+
+    def test_writes_from_several_threads(self):
+        errors = []
+
+        def write(name):
+            try:
+                for n in range(100):
+                    path = f"/{name}/{n}"
+                    self.db.save(path, self.metadata)
+                    self.patch(path, "system", {"size": n})
+                    self.db.save_batch([(path + ".bak", self.metadata)])
+                    self.db.delete(path + ".bak")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(name,)) for name in "ab"]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        stored = dict(self.db.load_all())
+        self.assertEqual(len(stored), 200)
+        for name in "ab":
+            for n in range(100):
+                self.assertEqual(stored[f"/{name}/{n}"]["system"], {"size": n})
+                self.assertEqual(stored[f"/{name}/{n}"]["user"], self.metadata["user"])
+
+
+class WalReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "db.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write_wal(self, *lines):
+        with open(self.path + ".wal", "wb") as f:
+            f.write(b"".join(lines))
+
+    def test_bad_line_in_the_middle_is_skipped(self):
+        self.write_wal(
+            b'{"op": "put", "path": "/a", "meta": {"n": 1}}\n',
+            b'{"op": "put", "path": "/b", "meta": \n',
+            b'{"op": "put", "path": "/c", "meta": {"n": NaN}}\n',
+            b'{"op": "put", "path": "/d", "meta": {"n": 4}}\n',
+        )
+
+        with self.assertLogs("FileMetaLib.storage", "WARNING"):
+            db = JsonDB(self.path)
+
+        self.assertEqual(db.load("/a"), {"n": 1})
+        self.assertIsNone(db.load("/b"))
+        self.assertTrue(math.isnan(db.load("/c")["n"]))
+        self.assertEqual(db.load("/d"), {"n": 4})
+        db.close()
+
+    def test_truncated_tail_is_dropped(self):
+        self.write_wal(
+            b'{"op": "put", "path": "/a", "meta": {"n": 1}}\n',
+            b'{"op": "put", "path": "/b", "meta": {"n"',
+        )
+
+        db = JsonDB(self.path)
+        self.assertEqual(db.load("/a"), {"n": 1})
+        self.assertIsNone(db.load("/b"))
+        db.close()
+
+        # The replayed change was checkpointed and the log cleared
+        db = JsonDB(self.path)
+        self.assertEqual(dict(db.load_all()), {"/a": {"n": 1}})
+        self.assertEqual(os.path.getsize(self.path + ".wal"), 0)
+        db.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
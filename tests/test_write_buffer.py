@@ -0,0 +1,163 @@
+import threading
+import time
+import unittest
+
+from FileMetaLib.storage import MemoryDB
+from FileMetaLib.write_buffer import WriteBuffer
+
+
+class FlakyDB(MemoryDB):
+    """MemoryDB that fails every write while fail is set."""
+
+    def __init__(self):
+        super().__init__()
+        self.fail = False
+        self.attempts = 0
+        self.batches = []
+        self.deletes = []
+        self.during_write = None
+        self._attempted = threading.Condition()
+
+    def save_batch(self, items):
+        self._attempt()
+        self.batches.append(list(items))
+        super().save_batch(items)
+
+    def delete(self, path):
+        self._attempt()
+        self.deletes.append(path)
+        super().delete(path)
+
+    def _attempt(self):
+        with self._attempted:
+            self.attempts += 1
+            self._attempted.notify_all()
+        if self.during_write is not None:
+            self.during_write()
+        if self.fail:
+            raise OSError("disk full")
+
+    def wait_for_attempts(self, count, timeout=5):
+        with self._attempted:
+            return self._attempted.wait_for(lambda: self.attempts >= count, timeout)
+
+
+class WriteBufferTest(unittest.TestCase):
+    def setUp(self):
+        self.db = FlakyDB()
+
+    def buffer(self, **kwargs):
+        # Without a short interval the background thread leaves flushing to
+        # the test
+        kwargs.setdefault("flush_interval", 60)
+        buffer = WriteBuffer(self.db, **kwargs)
+        self.addCleanup(self.close, buffer)
+        return buffer
+
+    def close(self, buffer):
+        self.db.fail = False
+        self.db.during_write = None
+        buffer.close()
+
+    def test_repeated_writes_are_coalesced(self):
+        buffer = self.buffer()
+        for n in range(3):
+            buffer.enqueue("/a", {"n": n})
+        buffer.enqueue("/b", {"n": 0})
+
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(self.db.batches, [[("/a", {"n": 2}), ("/b", {"n": 0})]])
+        self.assertEqual(buffer.flush(), 0)
+        self.assertEqual(len(self.db.batches), 1)
+
+    def test_delete_replaces_pending_save(self):
+        buffer = self.buffer()
+        self.db.save("/a", {"n": 0})
+        buffer.enqueue("/a", {"n": 1})
+        buffer.enqueue_delete("/a")
+        buffer.enqueue("/b", {"n": 1})
+        buffer.enqueue_delete("/b")
+        buffer.enqueue("/b", {"n": 2})
+
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(self.db.batches, [[("/b", {"n": 2})]])
+        self.assertEqual(self.db.deletes, ["/a"])
+        self.assertIsNone(self.db.load("/a"))
+
+    def test_failed_flush_requeues_batch(self):
+        buffer = self.buffer()
+        buffer.enqueue("/a", {"n": 1})
+        buffer.enqueue_delete("/b")
+        self.db.fail = True
+
+        with self.assertRaises(OSError):
+            buffer.flush()
+        self.assertEqual(len(buffer.pending), 2)
+
+        self.db.fail = False
+        self.assertEqual(buffer.flush(), 2)
+        self.assertEqual(self.db.load("/a"), {"n": 1})
+        self.assertEqual(buffer.pending, {})
+
+    def test_requeue_keeps_newer_writes(self):
+        buffer = self.buffer()
+        buffer.enqueue("/a", {"n": 1})
+        self.db.fail = True
+        self.db.during_write = lambda: buffer.enqueue("/a", {"n": 2})
+
+        with self.assertRaises(OSError):
+            buffer.flush()
+
+        self.db.fail = False
+        self.db.during_write = None
+        buffer.flush()
+        self.assertEqual(self.db.load("/a"), {"n": 2})
+
+    def test_background_flush_retries_then_waits(self):
+        buffer = self.buffer(flush_interval=0.001, max_retries=3)
+        self.db.fail = True
+
+        with self.assertLogs("FileMetaLib.write_buffer", "WARNING") as logs:
+            buffer.enqueue("/a", {"n": 1})
+            self.assertTrue(self.db.wait_for_attempts(3))
+            time.sleep(0.1)
+
+        # Backs off between attempts, then stops retrying
+        self.assertEqual(self.db.attempts, 3)
+        self.assertEqual([r.levelname for r in logs.records], ["WARNING", "WARNING", "ERROR"])
+        self.assertEqual(buffer.pending, {"/a": {"n": 1}})
+
+        self.db.fail = False
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(self.db.load("/a"), {"n": 1})
+
+        # The background thread resumed after the explicit flush
+        buffer.enqueue("/b", {"n": 1})
+        self.assertTrue(self.db.wait_for_attempts(5))
+
+    def test_earlier_flush_does_not_end_waiting(self):
+        buffer = self.buffer(flush_interval=0.001, max_retries=2)
+        buffer.enqueue("/a", {"n": 1})
+        buffer.flush()
+        self.db.fail = True
+
+        with self.assertLogs("FileMetaLib.write_buffer", "WARNING"):
+            buffer.enqueue("/a", {"n": 2})
+            self.assertTrue(self.db.wait_for_attempts(3))
+            time.sleep(0.1)
+
+        self.assertEqual(self.db.attempts, 3)
+
+    def test_close_flushes_pending_writes(self):
+        buffer = WriteBuffer(self.db, flush_interval=60)
+        buffer.enqueue("/a", {"n": 1})
+        buffer.enqueue_delete("/b")
+        buffer.close()
+
+        self.assertEqual(self.db.load("/a"), {"n": 1})
+        self.assertEqual(self.db.deletes, ["/b"])
+        self.assertFalse(buffer._thread.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()